@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Entry point ASGI del server di scraping - Aurora Seriate 1967
+Alternativa a "gunicorn selenium_api_server:app": con uvicorn le richieste
+non occupano più un thread WSGI ciascuna. /health risponde direttamente
+dall'event loop; le altre richieste eseguono l'app Flask su due executor
+limitati: uno per le risposte veloci (cache, stato, job) e uno per gli
+scraping veri, così pochi scraping lenti non bloccano le richieste economiche.
+
+Avvio:
+    uvicorn asgi_server:app --host 0.0.0.0 --port 10000 --workers 2
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+try:
+    import uvicorn
+    UVICORN_AVAILABLE = True
+except ImportError:
+    UVICORN_AVAILABLE = False
+
+import selenium_api_server as flask_server
+from results_archive import is_past_day
+
+logger = logging.getLogger(__name__)
+
+ASGI_FAST_THREADS = int(os.environ.get("ASGI_FAST_THREADS", 16))  # Cache hit, stato, job
+ASGI_SCRAPE_THREADS = int(os.environ.get("ASGI_SCRAPE_THREADS", 4))  # Richieste che possono scaricare
+
+# Endpoint che non avviano mai scraping nella richiesta
+FAST_PATHS = ("/", "/ready", "/browsers/memory", "/metrics", "/debug/traces", "/cache/status", "/changes", "/cache/clear", "/jobs", "/queue/status", "/schedule")
+
+fast_executor = ThreadPoolExecutor(max_workers=ASGI_FAST_THREADS, thread_name_prefix="asgi-fast")
+scrape_executor = ThreadPoolExecutor(max_workers=ASGI_SCRAPE_THREADS, thread_name_prefix="asgi-scrape")
+
+_END = object()
+
+
+def _is_fresh(cache_key, duration):
+    entry = flask_server.scraping_cache.get(cache_key)
+    return bool(entry) and time.time() - entry[1] < duration
+
+
+def _is_fast_request(method, path, query):
+    """True se la richiesta si risolve senza scraping (cache valida o endpoint di stato)"""
+    if path in FAST_PATHS or path.startswith(("/jobs/", "/debug/traces/")):
+        return True
+    if method != "GET":
+        return False
+
+    parts = path.strip("/").split("/")
+    if len(parts) == 2 and parts[0] == "scrape" and parts[1] not in ("all", "aurora-results"):
+        return _is_fresh(parts[1].upper(), flask_server.CACHE_DURATION)
+    if len(parts) == 2 and parts[0] == "standings":
+        return _is_fresh(f"standings_{parts[1].upper()}", flask_server.STANDINGS_CACHE_DURATION)
+    if path == "/scrape/aurora-results":
+        target_date = (parse_qs(query).get("date") or [None])[0]
+        return is_past_day(target_date) or _is_fresh(f"aurora_all_results_{target_date or 'today'}", flask_server.CACHE_DURATION)
+    return False
+
+
+def _wsgi_environ(scope, body):
+    """Environ WSGI da uno scope HTTP ASGI"""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _run_wsgi(environ, loop, queue):
+    """
+    Esegue l'app Flask e ne consuma la risposta nello stesso thread (i generatori
+    di streaming restano nel loro contesto), passando i pezzi all'event loop
+    """
+    def put(item):
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def start_response(status, headers, exc_info=None):
+        put(("start", int(status.split(" ", 1)[0]), headers))
+
+    iterable = None
+    try:
+        iterable = flask_server.app(environ, start_response)
+        for chunk in iterable:
+            if chunk:
+                put(("body", chunk))
+    except Exception as e:
+        logger.error(f"❌ Errore app WSGI: {e}")
+        put(("error", e))
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+        put(_END)
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _handle_http(scope, receive, send):
+    path = scope["path"]
+
+    # Health check direttamente sull'event loop: risponde anche con tutti i thread occupati
+    if path == "/health":
+        await _send_json(send, 200, {"status": "ok", "service": "selenium-api-server", "server": "asgi"})
+        return
+
+    body = await _read_body(receive)
+    query = scope.get("query_string", b"").decode("latin-1")
+    executor = fast_executor if _is_fast_request(scope["method"], path, query) else scrape_executor
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    loop.run_in_executor(executor, _run_wsgi, _wsgi_environ(scope, body), loop, queue)
+
+    started = False
+    while True:
+        item = await queue.get()
+        if item is _END:
+            break
+        if item[0] == "start" and not started:
+            _, status, headers = item
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+            })
+            started = True
+        elif item[0] == "body":
+            await send({"type": "http.response.body", "body": item[1], "more_body": True})
+        elif item[0] == "error" and not started:
+            await _send_json(send, 500, {"success": False, "error": f"Server error: {item[1]}"})
+            return
+
+    if started:
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def app(scope, receive, send):
+    """Applicazione ASGI"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                logger.info(f"🚀 ASGI server pronto ({ASGI_FAST_THREADS} thread veloci, {ASGI_SCRAPE_THREADS} per lo scraping)")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                fast_executor.shutdown(wait=False)
+                scrape_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+    await _handle_http(scope, receive, send)
+
+
+if __name__ == '__main__':
+    if not UVICORN_AVAILABLE:
+        logger.error("❌ uvicorn non installato: pip install uvicorn")
+        sys.exit(1)
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5001)))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark degli endpoint serviti dalla cache - Aurora Seriate 1967
+Riempie la cache con classifiche e risultati realistici e misura le richieste
+al secondo (client di test Flask, senza rete) con i corpi pre-serializzati
+disattivati (prima: jsonify a ogni richiesta) e attivati (dopo). Si misura solo
+la richiesta completa: confrontare jsonify con una lettura dal dizionario dei
+corpi già codificati darebbe speedup fuori scala che nessun client vede.
+
+Uso (dalla radice del repository):
+    python benchmarks/cached_endpoints.py [--seconds 3] [--gzip]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import selenium_api_server as server  # noqa: E402
+from json_codec import ORJSON_AVAILABLE  # noqa: E402
+
+ENDPOINTS = ["/scrape/U17", "/standings/U17", "/scrape/aurora-results", "/cache/status"]
+
+
+def fill_cache():
+    """Voci di cache con le dimensioni tipiche di una stagione"""
+    teams = [f"Squadra {index:02d} Calcio" for index in range(1, 17)] + ["Aurora Seriate 1967"]
+    for category in server.SUPPORTED_CATEGORIES:
+        standings = {
+            team.lower(): {
+                "position": position,
+                "team": team,
+                "points": 60 - position * 3,
+                "played": 30,
+                "wins": 18 - position // 2,
+                "draws": 6,
+                "losses": 6 + position // 2,
+                "goals_for": 55 - position,
+                "goals_against": 20 + position,
+            }
+            for position, team in enumerate(teams, start=1)
+        }
+        server._cache_put(f"standings_{category}", standings)
+        server._cache_put(category, {
+            "homeTeam": "AURORA SERIATE",
+            "awayTeam": teams[0].upper(),
+            "homeScore": 2,
+            "awayScore": 1,
+            "category": category,
+            "championship": f"Campionato {category}",
+        })
+
+    server._cache_put("aurora_all_results_today", [
+        {
+            "home_team": "AURORA SERIATE",
+            "away_team": teams[index].upper(),
+            "home_score": index % 4,
+            "away_score": index % 3,
+            "match_date": "2025-03-01 15:00",
+            "championship": f"Campionato {category}",
+            "category": category,
+            "status": "finita",
+            "note": "Dati Selenium",
+        }
+        for index, category in enumerate(server.SUPPORTED_CATEGORIES)
+    ])
+
+
+def measure(client, path, seconds, headers):
+    requests_done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, (path, response.status_code)
+        requests_done += 1
+    return requests_done / (time.perf_counter() - started), len(response.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="durata di ogni misura")
+    parser.add_argument("--gzip", action="store_true", help="invia Accept-Encoding: gzip")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    server.SELENIUM_AVAILABLE = True
+    fill_cache()
+    client = server.app.test_client()
+    headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+
+    print(f"Encoder: {'orjson' if ORJSON_AVAILABLE else 'json'}, gzip: {args.gzip}, {args.seconds}s per misura\n")
+    print(f"{'endpoint':<28}{'prima req/s':>14}{'dopo req/s':>14}{'speedup':>10}{'bytes':>10}")
+
+    for path in ENDPOINTS:
+        server.PRESERIALIZED_RESPONSES = False
+        before, _ = measure(client, path, args.seconds, headers)
+        server.PRESERIALIZED_RESPONSES = True
+        after, size = measure(client, path, args.seconds, headers)
+        print(f"{path:<28}{before:>14.0f}{after:>14.0f}{after / before:>9.2f}x{size:>10}")
+
+
+if __name__ == "__main__":
+    main()
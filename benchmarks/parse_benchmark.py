@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Benchmark dei parser sul corpus registrato - Aurora Seriate 1967
+Misura, senza rete né browser, i parser dello scraper sulle pagine di
+benchmarks/corpus/ (registrate con record_corpus.py): tempo per pagina
+(minimo e mediana di più ripetizioni), pagine al secondo, MB/s e memoria
+allocata (picco tracemalloc, in un passaggio separato per non falsare i tempi).
+
+Il confronto con la baseline (parse_baseline.json) non usa i millisecondi
+assoluti: il minimo per pagina, sommato per parser, viene diviso per il tempo
+di un ciclo di calibrazione fisso misurato nella stessa esecuzione, così una
+macchina più lenta o più carica sposta entrambi. Un parser oltre la soglia
+(--threshold) viene rimisurato (--reruns): è una regressione, con codice di
+uscita 1, solo se resta oltre la soglia in ogni nuova misura, altrimenti è
+segnalato come rumore.
+
+_extract_standings_from_page lavora sul DOM di Chrome (WebDriver) e resta fuori;
+qui c'è il suo equivalente su BeautifulSoup, _extract_standings_from_html.
+Per un nuovo parser basta aggiungerlo a PARSERS.
+
+Uso (dalla radice del repository):
+    python benchmarks/parse_benchmark.py [--min-time 0.2] [--threshold 0.5] [--parsers aurora_html,match_text]
+    python benchmarks/parse_benchmark.py --update-baseline
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import hashlib
+import logging
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from selenium_scraper import TuttocampoSeleniumScraper  # noqa: E402
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCHMARKS_DIR, "corpus")
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "parse_baseline.json")
+
+TARGET_DATE = "2025-03-01"  # Data fissa: niente datetime.now() nelle misure
+MIN_REPEATS = 5
+
+# Lavoro di riferimento (regex, stringhe e dict come i parser) per normalizzare i tempi
+CALIBRATION_TEXT = " ".join(f"SQUADRA {index} {index % 5} - {index % 3} AURORA SERIATE" for index in range(2000))
+
+
+def _aurora_rows(scraper, page):
+    """Testi (maiuscoli) delle righe con Aurora, l'input di _parse_match_text"""
+    return [text for text in (row.get_text().upper() for row in page["soup"].find_all("tr")) if "AURORA" in text]
+
+
+# parser -> (tipi di pagina, preparazione fuori dal tempo misurato, chiamata misurata)
+PARSERS = {
+    "html_document": (
+        ("results", "giornata", "standings"),
+        lambda scraper, page: page["raw"],
+        lambda scraper, page, raw: BeautifulSoup(raw, "html.parser"),
+    ),
+    "aurora_html": (
+        ("results", "giornata"),
+        lambda scraper, page: page["soup"],
+        lambda scraper, page, soup: scraper._extract_aurora_matches_from_html(soup, page["category"], TARGET_DATE),
+    ),
+    "match_text": (
+        ("results", "giornata"),
+        _aurora_rows,
+        lambda scraper, page, rows: [match for match in (scraper._parse_match_text(text, page["category"], TARGET_DATE) for text in rows) if match],
+    ),
+    "standings_html": (
+        ("standings",),
+        lambda scraper, page: page["soup"],
+        lambda scraper, page, soup: scraper._extract_standings_from_html(soup),
+    ),
+    "standings_jsonld": (
+        ("standings",),
+        lambda scraper, page: page["soup"],
+        lambda scraper, page, soup: scraper._extract_standings_from_jsonld(soup),
+    ),
+}
+
+
+def load_corpus():
+    """Pagine del corpus (bytes grezzi e soup già pronta) e impronta del manifest"""
+    manifest_path = os.path.join(CORPUS_DIR, "manifest.json")
+    if not os.path.exists(manifest_path):
+        sys.exit(f"❌ Corpus assente in {CORPUS_DIR}: registrarlo con benchmarks/record_corpus.py")
+    with open(manifest_path, "rb") as f:
+        manifest_bytes = f.read()
+
+    pages = []
+    for entry in json.loads(manifest_bytes)["pages"]:
+        with gzip.open(os.path.join(CORPUS_DIR, entry["file"]), "rb") as f:
+            raw = f.read()
+        if hashlib.sha256(raw).hexdigest() != entry["sha256"]:
+            sys.exit(f"❌ {entry['file']} non corrisponde al manifest: registrare di nuovo il corpus")
+        pages.append({**entry, "raw": raw, "soup": BeautifulSoup(raw, "html.parser")})
+    return pages, hashlib.sha256(manifest_bytes).hexdigest()[:16]
+
+
+def _items(result):
+    return len(result) if hasattr(result, "__len__") and not isinstance(result, BeautifulSoup) else 1
+
+
+def measure(call, min_time):
+    """(minimo, mediana) in ms e ripetizioni: almeno MIN_REPEATS chiamate e almeno min_time secondi"""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < MIN_REPEATS or time.perf_counter() - started < min_time:
+        call_started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - call_started) * 1000)
+    return min(timings), statistics.median(timings), len(timings)
+
+
+def _calibration_workload():
+    counts = {}
+    for token in re.findall(r"[A-Z]+|\d+", CALIBRATION_TEXT):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+def calibrate(min_time):
+    """Minimo in ms del ciclo di calibrazione: l'unità dei tempi normalizzati"""
+    return measure(_calibration_workload, max(min_time, 0.5))[0]
+
+
+def allocations(call):
+    """Picco di memoria allocata (KB) durante una chiamata"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round((peak - baseline) / 1024, 1)
+
+
+def measure_parser(scraper, name, pages, min_time, verbose=True):
+    """Minimo e mediana per pagina, totali del parser e picco di memoria"""
+    kinds, prepare, parse = PARSERS[name]
+    total_ms = total_median_ms = total_kb = peak_kb = 0.0
+    count = 0
+    for page in pages:
+        if page["kind"] not in kinds:
+            continue
+        prepared = prepare(scraper, page)
+        call = lambda: parse(scraper, page, prepared)  # noqa: E731
+        items = _items(call())
+        best_ms, median_ms, repeats = measure(call, min_time)
+        page_peak_kb = allocations(call)
+
+        size_kb = len(page["raw"]) / 1024
+        if verbose:
+            print(f"{name:<18}{page['file'].replace('.html.gz', ''):<28}{size_kb:>8.0f}{best_ms:>10.3f}{median_ms:>10.3f}"
+                  f"{1000 / best_ms:>10.0f}{size_kb / 1024 / (best_ms / 1000):>8.1f}{page_peak_kb:>10.1f}{items:>6}{repeats:>6}")
+        total_ms += best_ms
+        total_median_ms += median_ms
+        total_kb += size_kb
+        peak_kb = max(peak_kb, page_peak_kb)
+        count += 1
+
+    if not count:
+        return None
+    return {
+        "pages": count,
+        "total_ms": round(total_ms, 3),
+        "total_median_ms": round(total_median_ms, 3),
+        "pages_per_second": round(count * 1000 / total_ms, 1),
+        "mb_per_second": round(total_kb / 1024 / (total_ms / 1000), 2),
+        "peak_kb": peak_kb,
+    }
+
+
+def run(scraper, pages, parsers, min_time, calibration_ms):
+    report = {}
+    print(f"{'parser':<18}{'pagina':<28}{'KB':>8}{'ms min':>10}{'ms med':>10}{'pagine/s':>10}{'MB/s':>8}{'picco KB':>10}{'voci':>6}{'rip.':>6}")
+    for name in parsers:
+        measured = measure_parser(scraper, name, pages, min_time)
+        if measured:
+            measured["normalized"] = round(measured["total_ms"] / calibration_ms, 3)
+            report[name] = measured
+    return report
+
+
+def _deltas(current, previous):
+    time_delta = current["normalized"] / previous["normalized"] - 1
+    memory_delta = current["peak_kb"] / previous["peak_kb"] - 1 if previous["peak_kb"] else 0.0
+    return time_delta, memory_delta
+
+
+def compare(report, baseline, threshold):
+    """Tabella di confronto con la baseline (tempi normalizzati) e parser oltre la soglia"""
+    over = []
+    print(f"\n{'parser':<18}{'pagine':>7}{'ms min':>10}{'norm.':>9}{'baseline':>10}{'delta':>9}{'picco KB':>10}{'baseline':>10}{'delta':>9}")
+    for name, current in report.items():
+        previous = baseline.get(name)
+        if previous is None or "normalized" not in previous:
+            print(f"{name:<18}{current['pages']:>7}{current['total_ms']:>10.3f}{current['normalized']:>9.2f}{'nuovo':>10}")
+            continue
+        time_delta, memory_delta = _deltas(current, previous)
+        print(f"{name:<18}{current['pages']:>7}{current['total_ms']:>10.3f}{current['normalized']:>9.2f}{previous['normalized']:>10.2f}"
+              f"{time_delta:>+9.1%}{current['peak_kb']:>10.1f}{previous['peak_kb']:>10.1f}{memory_delta:>+9.1%}")
+        if time_delta > threshold or memory_delta > threshold:
+            over.append(name)
+    return over
+
+
+def confirm(scraper, pages, names, baseline, threshold, min_time, reruns):
+    """
+    Rimisura i parser oltre la soglia (con una nuova calibrazione): regressioni
+    quelle che restano oltre la soglia in ogni nuova misura, rumore le altre
+    """
+    regressions, noise = [], []
+    for name in names:
+        deltas = []
+        for _ in range(reruns):
+            calibration_ms = calibrate(min_time)
+            measured = measure_parser(scraper, name, pages, min_time, verbose=False)
+            measured["normalized"] = measured["total_ms"] / calibration_ms
+            deltas.append(_deltas(measured, baseline[name]))
+        time_deltas = [delta[0] for delta in deltas]
+        memory_deltas = [delta[1] for delta in deltas]
+        if min(time_deltas) > threshold:
+            regressions.append(f"{name}: tempo {min(time_deltas):+.1%}")
+        elif min(memory_deltas) > threshold:
+            regressions.append(f"{name}: memoria {min(memory_deltas):+.1%}")
+        else:
+            noise.append(f"{name}: rimisurato {', '.join(f'{delta:+.1%}' for delta in time_deltas)}")
+    return regressions, noise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-time", type=float, default=0.2, help="secondi minimi di misura per pagina e parser")
+    parser.add_argument("--threshold", type=float, default=0.5, help="regressione tollerata rispetto alla baseline (0.5 = +50%%)")
+    parser.add_argument("--reruns", type=int, default=2, help="nuove misure di un parser oltre la soglia prima di fallire")
+    parser.add_argument("--parsers", default="", help="parser separati da virgola (default: tutti)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="file JSON della baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="salva i risultati come nuova baseline")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # I parser loggano le righe non riconosciute: non fa parte della misura
+    parsers = [name.strip() for name in args.parsers.split(",") if name.strip()] or list(PARSERS)
+    unknown = [name for name in parsers if name not in PARSERS]
+    if unknown:
+        sys.exit(f"❌ Parser sconosciuti: {', '.join(unknown)} (disponibili: {', '.join(PARSERS)})")
+
+    pages, corpus_id = load_corpus()
+    sources = sorted({page["source"] for page in pages})
+    scraper = TuttocampoSeleniumScraper()
+    calibration_ms = calibrate(args.min_time)
+    print(f"Corpus {corpus_id}: {len(pages)} pagine ({', '.join(sources)}), Python {platform.python_version()}, "
+          f"calibrazione {calibration_ms:.3f} ms\n")
+    report = run(scraper, pages, parsers, args.min_time, calibration_ms)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "corpus": corpus_id,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "calibration_ms": round(calibration_ms, 4),
+                "parsers": report,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\n💾 Baseline aggiornata: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ Nessuna baseline in {args.baseline}: crearla con --update-baseline")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("corpus") != corpus_id:
+        print(f"\n⚠️ La baseline è di un altro corpus ({baseline.get('corpus')}): aggiornarla con --update-baseline")
+        return 0
+
+    over = compare(report, baseline["parsers"], args.threshold)
+    regressions, noise = confirm(scraper, pages, over, baseline["parsers"], args.threshold, args.min_time, args.reruns)
+    if noise:
+        print("\n⚠️ Oltre la soglia solo nella prima misura (rumore): " + "; ".join(noise))
+    if regressions:
+        print(f"\n❌ Regressioni oltre il {args.threshold:.0%}: " + "; ".join(regressions))
+        return 1
+    print(f"\n✅ Nessuna regressione oltre il {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Registrazione del corpus per il benchmark dei parser - Aurora Seriate 1967
+Scarica da tuttocampo la pagina dei risultati, della classifica e di una
+giornata per ogni categoria di CATEGORY_URL_TEMPLATES e le salva compresse in
+benchmarks/corpus/ con un manifest (URL, dimensione, sha256, data). Da rifare
+quando tuttocampo cambia markup, poi aggiornare la baseline:
+    python benchmarks/parse_benchmark.py --update-baseline
+
+Con --synthetic non usa la rete: genera pagine deterministiche con la stessa
+struttura (tabelle delle partite, tabella classifica, JSON-LD delle squadre e
+il contorno di una pagina reale), utili finché non c'è un corpus registrato.
+
+Uso (dalla radice del repository):
+    python benchmarks/record_corpus.py [--giornata 5] [--categories U19,U17] [--synthetic]
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium_scraper import TuttocampoSeleniumScraper  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+MANIFEST = "manifest.json"
+
+# Squadre per girone nelle pagine sintetiche (i provinciali sono più piccoli)
+SYNTHETIC_TEAMS = {"PROMOZIONE": 16, "U21": 14, "U19": 16, "U18": 16, "U17": 16, "U16": 14, "U15": 12, "U14": 12}
+SYNTHETIC_NAMES = [
+    "Gorle", "Cividate Calcio", "Virtus Ciserano", "Luzzana", "Brusaporto", "Verdello", "Carobbio",
+    "Mapello", "Virescit Boccaleone", "Club Alzano", "Oratorio Celadina", "Grumellese", "Ponteranica",
+    "Scanzorosciate", "Città di Albino", "ADS Pontida", "Lallio Calcio", "Cavernago", "Falco",
+    "Calcio Credaro", "Or.Boccaleone", "Albano", "Bergamo Stars", "Barianese", "Sant'Antonio",
+]
+
+
+def page_urls(category, giornata):
+    """URL delle pagine da registrare per una categoria: {tipo: url}"""
+    template = TuttocampoSeleniumScraper.CATEGORY_URL_TEMPLATES[category]
+    results_url = TuttocampoSeleniumScraper.RESULTS_PAGE_URLS[category]
+    if "{giornata}" in template:
+        giornata_url = template.format(giornata=giornata)
+    else:
+        giornata_url = results_url.replace("/Risultati", f"/Giornata{giornata}")
+    return {
+        "results": results_url,
+        "standings": TuttocampoSeleniumScraper.STANDINGS_PAGE_URLS[category],
+        "giornata": giornata_url,
+    }
+
+
+def fetch(session, url):
+    response = session.get(url, timeout=20)
+    response.raise_for_status()
+    return response.content
+
+
+def _teams(category):
+    rng = random.Random(f"teams-{category}")
+    teams = rng.sample(SYNTHETIC_NAMES, SYNTHETIC_TEAMS[category] - 1) + ["Aurora Seriate 1967"]
+    rng.shuffle(teams)
+    return [team.upper() for team in teams]
+
+
+def _schedule(teams):
+    """Calendario all'italiana (metodo del cerchio): giornate di coppie (casa, trasferta)"""
+    rotation = list(teams)
+    rounds = []
+    for _ in range(len(teams) - 1):
+        half = len(rotation) // 2
+        rounds.append(list(zip(rotation[:half], reversed(rotation[half:]))))
+        rotation = [rotation[0], rotation[-1]] + rotation[1:-1]
+    return rounds + [[(away, home) for home, away in matches] for matches in rounds]
+
+
+def _page(title, body, category):
+    """Contorno di una pagina tuttocampo: head, menu, banner e footer attorno al contenuto"""
+    menu = ""
+    for name in ("Eccellenza", "Promozione", "PrimaCategoria", "SecondaCategoria", "Juniores", "Allievi", "Giovanissimi"):
+        groups = "".join(f'<li><a href="/Lombardia/{name}/Girone{group}">Girone {group}</a></li>' for group in "ABCDEF")
+        menu += f'<li class="nav-item"><a class="nav-link" href="/Lombardia/{name}">{name}</a><ul class="dropdown">{groups}</ul></li>'
+    banners = "".join(f'<div class="adv-slot" id="adv-{index}"><script>window.adv=window.adv||[];adv.push({index});</script></div>' for index in range(12))
+    news = "".join(
+        f'<article class="news-card"><a href="/news/{index}"><img src="/img/{index}.jpg" alt="">'
+        f'<h3>Notizia {index} dal calcio lombardo</h3><p>{"Lorem ipsum dolor sit amet. " * 6}</p></a></article>'
+        for index in range(20)
+    )
+    return (
+        f'<!DOCTYPE html><html lang="it"><head><meta charset="utf-8"><title>{title} | Tuttocampo.it</title>'
+        f'<link rel="stylesheet" href="/css/main.css"><script src="/js/vendor.js"></script></head><body>'
+        f'<header><nav><ul class="navbar">{menu}</ul></nav></header>{banners}'
+        f'<main class="container"><h1>{title}</h1><div class="category" data-category="{category}">{body}</div>'
+        f'<aside class="news">{news}</aside></main>'
+        f'<footer>{"<p>Tuttocampo.it - tutti i diritti riservati</p>" * 5}</footer></body></html>'
+    )
+
+
+def _match_table(number, matches, rng):
+    rows = "".join(
+        f'<tr><td class="date">{rng.randint(1, 28):02d}/03 15:00</td>'
+        f'<td class="team home"><a href="/Squadra/{home}">{home}</a></td>'
+        f'<td class="score"><a href="/Partita/{number}">{rng.randint(0, 4)} - {rng.randint(0, 4)}</a></td>'
+        f'<td class="team away"><a href="/Squadra/{away}">{away}</a></td></tr>'
+        for home, away in matches
+    )
+    return f'<h2>Giornata {number}</h2><table class="table"><tbody>{rows}</tbody></table>'
+
+
+def synthetic_page(category, kind, giornata):
+    """Pagina deterministica con la struttura di tuttocampo per categoria e tipo"""
+    rng = random.Random(f"{category}-{kind}")
+    teams = _teams(category)
+    rounds = _schedule(teams)
+
+    if kind == "results":
+        body = "".join(_match_table(number, matches, rng) for number, matches in enumerate(rounds, start=1))
+        return _page(f"Risultati {category}", body, category)
+    if kind == "giornata":
+        number = min(max(giornata, 1), len(rounds))
+        return _page(f"Giornata {number} {category}", _match_table(number, rounds[number - 1], rng), category)
+
+    header = "".join(f"<th>{name}</th>" for name in ("Pos", "", "Squadra", "Pt", "G", "V", "N", "P", "GF", "GS", "DR"))
+    rows = []
+    for position, team in enumerate(teams, start=1):
+        wins, draws, losses = rng.randint(2, 15), rng.randint(0, 8), rng.randint(0, 12)
+        goals_for, goals_against = rng.randint(10, 50), rng.randint(10, 50)
+        cells = [position, '<img src="/logo.png" alt="">', f'<a href="/Squadra/{team}">{team}</a>', wins * 3 + draws,
+                 wins + draws + losses, wins, draws, losses, goals_for, goals_against, goals_for - goals_against]
+        rows.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+    jsonld = json.dumps({
+        "@context": "https://schema.org",
+        "@type": "ItemList",
+        "name": f"Squadre {category}",
+        "itemListElement": [{"@type": "SportsTeam", "position": index, "name": team.title()} for index, team in enumerate(sorted(teams), start=1)],
+    }, ensure_ascii=False)
+    body = (f'<script type="application/ld+json">{jsonld}</script>'
+            f'<table class="classifica"><thead><tr>{header}</tr></thead><tbody>{"".join(rows)}</tbody></table>')
+    return _page(f"Classifica {category}", body, category)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--giornata", type=int, default=5, help="giornata da registrare per le pagine Giornata")
+    parser.add_argument("--categories", default="", help="categorie separate da virgola (default: tutte)")
+    parser.add_argument("--synthetic", action="store_true", help="genera pagine sintetiche senza rete")
+    parser.add_argument("--delay", type=float, default=1.0, help="pausa tra due download (secondi)")
+    args = parser.parse_args()
+
+    categories = [name.strip().upper() for name in args.categories.split(",") if name.strip()] or list(TuttocampoSeleniumScraper.CATEGORY_URL_TEMPLATES)
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+
+    manifest_path = os.path.join(CORPUS_DIR, MANIFEST)
+    pages = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            pages = {page["file"]: page for page in json.load(f)["pages"]}
+
+    session = None
+    if not args.synthetic:
+        import requests
+        session = requests.Session()
+        session.headers.update(TuttocampoSeleniumScraper.HTTP_HEADERS)
+
+    for category in categories:
+        for kind, url in page_urls(category, args.giornata).items():
+            try:
+                if args.synthetic:
+                    content = synthetic_page(category, kind, args.giornata).encode("utf-8")
+                else:
+                    content = fetch(session, url)
+                    time.sleep(args.delay)
+            except Exception as e:
+                print(f"❌ {category} {kind}: {e}")
+                continue
+
+            name = f"{category}_{kind}.html.gz"
+            with gzip.GzipFile(os.path.join(CORPUS_DIR, name), "wb", mtime=0) as f:
+                f.write(content)
+            pages[name] = {
+                "file": name,
+                "category": category,
+                "kind": kind,
+                "url": url,
+                "source": "synthetic" if args.synthetic else "live",
+                "bytes": len(content),
+                "sha256": hashlib.sha256(content).hexdigest(),
+                "recorded_at": None if args.synthetic else time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }
+            print(f"✅ {name:<28}{len(content):>10} bytes  {url}")
+
+    with open(manifest_path, "w") as f:
+        json.dump({"pages": sorted(pages.values(), key=lambda page: page["file"])}, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"\n📁 {len(pages)} pagine in {CORPUS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Governo della memoria dei browser - Aurora Seriate 1967
+Sul piano da 512 MB di Render i Chrome del pool (--single-process, mai
+riavviati) crescono finché il container viene ucciso per OOM. Qui si misura
+da /proc la RSS dell'albero di processi di ogni browser (chromedriver + Chrome)
+e si decide quando riciclarlo; sotto pressione di memoria del container non si
+creano browser temporanei
+"""
+
+import os
+import time
+import logging
+
+from metrics import BROWSER_RECYCLES
+
+logger = logging.getLogger(__name__)
+
+BROWSER_RSS_LIMIT_MB = float(os.environ.get("BROWSER_RSS_LIMIT_MB", 300))  # Riciclo oltre questa RSS
+BROWSER_MAX_NAVIGATIONS = int(os.environ.get("BROWSER_MAX_NAVIGATIONS", 150))  # Riciclo dopo N pagine
+MEMORY_PRESSURE_PERCENT = float(os.environ.get("MEMORY_PRESSURE_PERCENT", 85))  # Niente browser temporanei oltre
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Limite e uso di memoria del container: cgroup v2, poi v1
+CGROUP_MEMORY_FILES = (
+    ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+    ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes"),
+)
+UNLIMITED_BYTES = 1 << 60  # cgroup v1 senza limite riporta un valore enorme
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _children_map():
+    """ppid -> [pid] di tutti i processi visibili in /proc"""
+    children = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        stat = _read(f"/proc/{entry}/stat")
+        if not stat:
+            continue
+        # Il nome del processo può contenere spazi: i campi seguono l'ultima ')'
+        fields = stat.rsplit(")", 1)[-1].split()
+        if len(fields) > 1:
+            children.setdefault(int(fields[1]), []).append(int(entry))
+    return children
+
+
+def process_tree_rss_mb(pid, children=None):
+    """RSS (MB) del processo e di tutti i discendenti, None se il processo non esiste più"""
+    if not pid:
+        return None
+    children = children if children is not None else _children_map()
+
+    total_pages = 0
+    found = False
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        statm = _read(f"/proc/{current}/statm")
+        if statm:
+            found = True
+            total_pages += int(statm.split()[1])
+        stack.extend(children.get(current, ()))
+    return round(total_pages * PAGE_SIZE / (1024 * 1024), 1) if found else None
+
+
+def container_memory():
+    """(usato, limite) in byte per il container, None se non determinabile"""
+    for limit_path, usage_path in CGROUP_MEMORY_FILES:
+        limit, usage = _read(limit_path), _read(usage_path)
+        if limit and usage and limit.strip() != "max" and int(limit) < UNLIMITED_BYTES:
+            return int(usage), int(limit)
+
+    meminfo = _read("/proc/meminfo")
+    if not meminfo:
+        return None
+    values = {line.split(":")[0]: int(line.split()[1]) * 1024 for line in meminfo.splitlines() if ":" in line}
+    if "MemTotal" in values and "MemAvailable" in values:
+        return values["MemTotal"] - values["MemAvailable"], values["MemTotal"]
+    return None
+
+
+def driver_pid(scraper):
+    """PID del chromedriver del browser (Chrome ne è figlio), None se non avviato"""
+    try:
+        return scraper.driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class BrowserMemoryGovernor:
+    """Decide riciclo dei browser e creazione dei temporanei in base alla memoria"""
+
+    def __init__(self, rss_limit_mb=BROWSER_RSS_LIMIT_MB, max_navigations=BROWSER_MAX_NAVIGATIONS,
+                 pressure_percent=MEMORY_PRESSURE_PERCENT):
+        self.rss_limit_mb = rss_limit_mb
+        self.max_navigations = max_navigations
+        self.pressure_percent = pressure_percent
+        self.stats = {"recycled_rss": 0, "recycled_navigations": 0, "refused_under_pressure": 0}
+
+    def sample(self, scraper, children=None):
+        """Memoria e uso di un browser"""
+        pid = driver_pid(scraper)
+        return {
+            "pid": pid,
+            "rss_mb": process_tree_rss_mb(pid, children),
+            "navigations": getattr(scraper, "navigations", 0),
+            "age_seconds": round(time.time() - scraper.started_at, 1) if getattr(scraper, "started_at", None) else None,
+        }
+
+    def recycle_reason(self, scraper):
+        """Motivo per riciclare il browser (RSS o navigazioni), None se può restare nel pool"""
+        if driver_pid(scraper) is None:
+            return None
+
+        navigations = getattr(scraper, "navigations", 0)
+        if navigations >= self.max_navigations:
+            self.stats["recycled_navigations"] += 1
+            BROWSER_RECYCLES.inc(reason="navigations")
+            return f"{navigations} navigations >= {self.max_navigations}"
+
+        rss_mb = process_tree_rss_mb(driver_pid(scraper))
+        if rss_mb is not None and rss_mb >= self.rss_limit_mb:
+            self.stats["recycled_rss"] += 1
+            BROWSER_RECYCLES.inc(reason="rss")
+            return f"RSS {rss_mb:.0f}MB >= {self.rss_limit_mb:.0f}MB"
+        return None
+
+    def memory_percent(self):
+        memory = container_memory()
+        if not memory:
+            return None
+        used, limit = memory
+        return round(used * 100 / limit, 1)
+
+    def under_pressure(self):
+        """True se il container è oltre MEMORY_PRESSURE_PERCENT: niente nuovi browser"""
+        percent = self.memory_percent()
+        if percent is not None and percent >= self.pressure_percent:
+            self.stats["refused_under_pressure"] += 1
+            logger.warning(f"🧠 Memoria del container al {percent}%: nessun browser temporaneo")
+            return True
+        return False
+
+    def status(self, scrapers):
+        """Memoria per browser (una sola scansione di /proc) e del container"""
+        children = _children_map()
+        memory = container_memory()
+        return {
+            "rss_limit_mb": self.rss_limit_mb,
+            "max_navigations": self.max_navigations,
+            "pressure_percent": self.pressure_percent,
+            "container_used_mb": round(memory[0] / (1024 * 1024), 1) if memory else None,
+            "container_limit_mb": round(memory[1] / (1024 * 1024), 1) if memory else None,
+            "container_percent": round(memory[0] * 100 / memory[1], 1) if memory else None,
+            "browsers": [{"state": state, **self.sample(scraper, children)} for state, scraper in scrapers],
+            "stats": dict(self.stats),
+        }
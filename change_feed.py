@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Change feed versionato per risultati e classifiche - Aurora Seriate 1967
+Ogni nuovo scraping viene confrontato con il precedente: solo le voci
+cambiate finiscono nel log, con una versione monotona che i client usano
+per chiedere "cosa è cambiato dalla versione N"
+
+Backend (variabile CHANGE_FEED_BACKEND, di default come SCRAPE_LEASE_BACKEND):
+    memory - log in memoria del processo: /changes richiede un solo worker,
+             con più worker ogni risposta arriva da un log diverso (reset continui)
+    sqlite - log, snapshot, versione ed epoch su un file SQLite condiviso dai
+             worker gunicorn del container (CHANGE_FEED_PATH)
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CHANGE_FEED_MAX_ENTRIES = int(os.environ.get("CHANGE_FEED_MAX_ENTRIES", 2000))
+CHANGE_FEED_BACKEND = os.environ.get("CHANGE_FEED_BACKEND", os.environ.get("SCRAPE_LEASE_BACKEND", "memory")).lower()
+CHANGE_FEED_PATH = os.environ.get("CHANGE_FEED_PATH", "/tmp/aurora_change_feed.db")
+
+
+def result_entry_key(result):
+    """Chiave stabile di una partita: squadre in casa e ospite (camelCase o snake_case)"""
+    home = result.get("homeTeam", result.get("home_team", ""))
+    away = result.get("awayTeam", result.get("away_team", ""))
+    return f"{home}|{away}".lower()
+
+
+def _diff(previous, entries):
+    """Voci aggiunte, modificate o rimosse tra due snapshot {chiave: dati}"""
+    changes = []
+    for key, data in entries.items():
+        if key not in previous:
+            changes.append(("added", key, data))
+        elif previous[key] != data:
+            changes.append(("changed", key, data))
+    for key in previous:
+        if key not in entries:
+            changes.append(("removed", key, None))
+    return changes
+
+
+class ChangeFeed:
+    """Log circolare delle modifiche con versione monotona per processo"""
+
+    name = "memory"
+
+    def __init__(self, max_entries=CHANGE_FEED_MAX_ENTRIES):
+        # L'epoch cambia a ogni avvio: i client con un epoch diverso devono ricaricare tutto.
+        # È anche diverso per ogni worker, quindi questo backend vale per un solo worker
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.entries = deque(maxlen=max_entries)
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    def record(self, kind, category, entries):
+        """
+        Confronta il nuovo snapshot {chiave: dati} con il precedente per (kind, category)
+        e aggiunge al log le voci aggiunte, modificate o rimosse
+        """
+        with self.lock:
+            previous = self.snapshots.get((kind, category), {})
+            now = time.time()
+            changes = _diff(previous, entries)
+
+            for op, key, data in changes:
+                self.version += 1
+                self.entries.append({
+                    "version": self.version,
+                    "kind": kind,
+                    "category": category,
+                    "key": key,
+                    "op": op,
+                    "data": data,
+                    "timestamp": now,
+                })
+
+            self.snapshots[(kind, category)] = dict(entries)
+            return len(changes)
+
+    def record_result(self, category, result):
+        """Risultato singolo di una categoria (/scrape/<category>)"""
+        self.record("result", category, {result_entry_key(result): result})
+
+    def record_standings(self, category, standings):
+        """Classifica come mappa {team_key: dati}"""
+        self.record("standings", category, dict(standings))
+
+    def record_aurora_results(self, date_key, results):
+        """Lista dei risultati Aurora del giorno, una voce per partita"""
+        self.record("aurora_results", date_key, {
+            f"{result.get('category')}|{result_entry_key(result)}": result for result in results
+        })
+
+    def since(self, version, epoch=None, kind=None, category=None):
+        """
+        Ritorna (changes, reset, current_version). reset=True quando il client deve
+        ricaricare tutto: epoch diverso, versione futura o voci già uscite dal log circolare
+        """
+        with self.lock:
+            oldest = self.entries[0]["version"] if self.entries else self.version + 1
+            if _needs_reset(version, epoch, self.epoch, self.version, oldest):
+                return [], True, self.version
+
+            changes = [
+                entry for entry in self.entries
+                if entry["version"] > version
+                and (kind is None or entry["kind"] == kind)
+                and (category is None or entry["category"] == category)
+            ]
+            return changes, False, self.version
+
+
+def _needs_reset(version, epoch, current_epoch, current_version, oldest):
+    return (
+        (epoch is not None and epoch != current_epoch)
+        or version > current_version
+        or (version < oldest - 1 and version < current_version)
+    )
+
+
+class SQLiteChangeFeed(ChangeFeed):
+    """
+    Change feed su un file SQLite condiviso: tutti i worker scrivono nello stesso log,
+    confrontano con lo stesso snapshot e rispondono con la stessa versione ed epoch.
+    L'epoch resta quello del file: cambia solo quando il file viene ricreato
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=CHANGE_FEED_PATH, max_entries=CHANGE_FEED_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (version INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+                "category TEXT, key TEXT NOT NULL, op TEXT NOT NULL, data TEXT, timestamp REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots (kind TEXT NOT NULL, category TEXT NOT NULL, "
+                "payload TEXT NOT NULL, PRIMARY KEY (kind, category))"
+            )
+            # Il primo worker che crea il file decide l'epoch, gli altri lo leggono
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:12],))
+            self.epoch = conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    @staticmethod
+    def _version(conn):
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'entries'").fetchone()
+        return row[0] if row else 0
+
+    @property
+    def version(self):
+        conn = self._connect()
+        try:
+            return self._version(conn)
+        finally:
+            conn.close()
+
+    def record(self, kind, category, entries):
+        # Snapshot normalizzato come lo rilegge json: tuple e liste confrontano uguali
+        entries = json.loads(json.dumps(entries))
+        category = str(category)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT payload FROM snapshots WHERE kind = ? AND category = ?", (kind, category)).fetchone()
+            changes = _diff(json.loads(row[0]) if row else {}, entries)
+
+            conn.executemany(
+                "INSERT INTO entries (kind, category, key, op, data, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                [(kind, category, key, op, json.dumps(data), now) for op, key, data in changes]
+            )
+            if changes:
+                conn.execute("DELETE FROM entries WHERE version <= ?", (self._version(conn) - self.max_entries,))
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (kind, category, payload) VALUES (?, ?, ?)",
+                (kind, category, json.dumps(entries))
+            )
+            conn.execute("COMMIT")
+            return len(changes)
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def since(self, version, epoch=None, kind=None, category=None):
+        conn = self._connect()
+        try:
+            # Lettura in una sola transazione: versione e voci coerenti tra loro
+            conn.execute("BEGIN")
+            current = self._version(conn)
+            oldest = conn.execute("SELECT MIN(version) FROM entries").fetchone()[0] or current + 1
+            if _needs_reset(version, epoch, self.epoch, current, oldest):
+                conn.execute("COMMIT")
+                return [], True, current
+
+            query = "SELECT version, kind, category, key, op, data, timestamp FROM entries WHERE version > ? AND version <= ?"
+            params = [version, current]
+            if kind is not None:
+                query += " AND kind = ?"
+                params.append(kind)
+            if category is not None:
+                query += " AND category = ?"
+                params.append(category)
+            rows = conn.execute(query + " ORDER BY version", params).fetchall()
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        changes = [
+            {"version": row[0], "kind": row[1], "category": row[2], "key": row[3], "op": row[4],
+             "data": json.loads(row[5]), "timestamp": row[6]}
+            for row in rows
+        ]
+        return changes, False, current
+
+
+def create_change_feed(name=CHANGE_FEED_BACKEND, path=CHANGE_FEED_PATH):
+    """
+    Change feed configurato; se il file condiviso non è utilizzabile torna al log
+    in memoria (valido solo con un worker) invece di impedire l'avvio
+    """
+    if name == "sqlite":
+        try:
+            return SQLiteChangeFeed(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Change feed SQLite non disponibile ({e}), log in memoria: /changes richiede un solo worker")
+    elif name not in ("memory", "none"):
+        logger.warning(f"⚠️ Change feed '{name}' non supportato, log in memoria: /changes richiede un solo worker")
+    return ChangeFeed()
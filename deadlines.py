@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Scadenze delle richieste - Aurora Seriate 1967
+L'app Flutter abbandona una richiesta dopo 30-120 secondi: oltre quel limite
+lo scraping lavora per una risposta che nessuno leggerà. Ogni richiesta porta
+una scadenza (header X-Request-Deadline-Ms o default per endpoint) che arriva
+fino allo scraper, controllata tra una navigazione e l'altra
+"""
+
+import os
+import time
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"  # Budget in millisecondi dal momento della richiesta
+DEADLINE_MAX_SECONDS = float(os.environ.get("DEADLINE_MAX_SECONDS", 300))  # Tetto a budget richiesti troppo lunghi
+DEADLINE_MIN_SECONDS = 1.0
+
+# Scadenza di default per endpoint (secondi), in linea con i timeout dei client
+DEADLINE_DEFAULTS = {
+    "scrape_category": float(os.environ.get("DEADLINE_SCRAPE_CATEGORY", 60)),
+    "scrape_all": float(os.environ.get("DEADLINE_SCRAPE_ALL", 120)),
+    "standings": float(os.environ.get("DEADLINE_STANDINGS", 60)),
+    "aurora_results": float(os.environ.get("DEADLINE_AURORA_RESULTS", 90)),
+    "update_standings": float(os.environ.get("DEADLINE_UPDATE_STANDINGS", 120)),
+    "batch": float(os.environ.get("DEADLINE_BATCH", 60)),
+}
+
+
+class DeadlineExceeded(Exception):
+    """La richiesta ha superato la sua scadenza: il lavoro rimasto va abbandonato"""
+
+
+class Deadline:
+    """Istante assoluto entro cui una richiesta deve finire"""
+
+    __slots__ = ("expires_at", "budget")
+
+    def __init__(self, seconds):
+        self.budget = seconds
+        self.expires_at = time.time() + seconds
+
+    @classmethod
+    def from_header(cls, value, default_seconds):
+        """Scadenza dall'header (millisecondi) o il default dell'endpoint se assente/non valido"""
+        try:
+            seconds = float(value) / 1000 if value else default_seconds
+        except (TypeError, ValueError):
+            seconds = default_seconds
+        return cls(min(max(seconds, DEADLINE_MIN_SECONDS), DEADLINE_MAX_SECONDS))
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self):
+        return time.time() >= self.expires_at
+
+    def check(self, stage=""):
+        """Solleva DeadlineExceeded se la scadenza è passata"""
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.budget:g}s exceeded{f' before {stage}' if stage else ''}")
+
+    def timeout(self, cap):
+        """Timeout per un'operazione bloccante: al massimo cap, mai oltre la scadenza"""
+        self.check()
+        return max(0.1, min(cap, self.remaining()))
+
+    def sleep(self, seconds):
+        """Pausa che non supera la scadenza, poi controlla"""
+        time.sleep(min(seconds, self.remaining()))
+        self.check()
+
+
+def check_deadline(deadline, stage=""):
+    """deadline.check() che accetta anche None (nessuna scadenza)"""
+    if deadline is not None:
+        deadline.check(stage)
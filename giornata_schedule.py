@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Calendario delle giornate in memoria - Aurora Seriate 1967
+Poche query a pagine caricano data, giornata e avversario delle partite
+recenti e future di ogni aurora_team: la costruzione degli URL dinamici
+(es. U19) legge la giornata corrente da qui senza andare sul database. Il calendario si aggiorna da solo ogni
+GIORNATA_SCHEDULE_TTL secondi oppure su richiesta dopo una modifica
+"""
+
+import os
+import re
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+
+from supabase_client import get_supabase_client
+from metrics import SUPABASE_QUERY_SECONDS
+from tracing import span
+from team_names import TeamIndex
+
+logger = logging.getLogger(__name__)
+
+GIORNATA_SCHEDULE_TTL = int(os.environ.get("GIORNATA_SCHEDULE_TTL", 900))  # 15 minuti
+GIORNATA_SCHEDULE_RETRY = 60  # Nuovo tentativo dopo un errore di caricamento
+GIORNATA_SCHEDULE_PAST_DAYS = int(os.environ.get("GIORNATA_SCHEDULE_PAST_DAYS", 180))  # Partite passate caricate
+GIORNATA_SCHEDULE_PAGE_SIZE = 1000  # Righe per pagina, entro il max-rows di PostgREST
+MATCH_LOOKUP_DAYS = 7  # Una partita del calendario vale per un risultato fino a una settimana dopo
+
+
+def clean_giornata_number(giornata_raw):
+    """Rimuove i caratteri A o R dalla fine della giornata e ritorna solo il numero"""
+    if not giornata_raw:
+        return None
+
+    giornata_str = str(giornata_raw).strip().upper()
+    # Rimuovi A o R alla fine
+    if giornata_str.endswith('A') or giornata_str.endswith('R'):
+        giornata_str = giornata_str[:-1]
+
+    # Estrai solo i numeri
+    numbers = re.findall(r'\d+', giornata_str)
+    if numbers:
+        return numbers[0]
+    return None
+
+
+class GiornataSchedule:
+    """Mappa aurora_team -> partite [(data, giornata, avversario)] ordinate per data"""
+
+    def __init__(self, ttl=GIORNATA_SCHEDULE_TTL):
+        self.ttl = ttl
+        self.teams = {}
+        self.loaded_at = None
+        self.next_refresh_at = None
+        self.refreshing = False
+        self.last_error = None
+        self.refresh_count = 0
+        self.lock = threading.Lock()
+
+    def _load_rows(self):
+        """
+        Partite da GIORNATA_SCHEDULE_PAST_DAYS fa in poi, a pagine: PostgREST tronca
+        le risposte al suo max-rows e con l'ordine per data si perderebbero le più recenti
+        """
+        since = (datetime.now() - timedelta(days=GIORNATA_SCHEDULE_PAST_DAYS)).strftime('%Y-%m-%d')
+        supabase = get_supabase_client()
+        rows = []
+        while True:
+            # Un builder nuovo per pagina: i filtri si accumulano sull'oggetto query
+            page = (
+                supabase.table('matches').select('aurora_team, date, giornata, opponent')
+                .gte('date', since).order('date').order('id')
+                .range(len(rows), len(rows) + GIORNATA_SCHEDULE_PAGE_SIZE - 1)
+                .execute().data
+            )
+            rows.extend(page)
+            if len(page) < GIORNATA_SCHEDULE_PAGE_SIZE:
+                return rows
+
+    def refresh(self):
+        """Ricarica il calendario da 'matches' (finestra di date, a pagine)"""
+        started = time.time()
+        try:
+            with span("supabase.matches_schedule"), SUPABASE_QUERY_SECONDS.time(query="matches_schedule"):
+                rows = self._load_rows()
+        except Exception as e:
+            with self.lock:
+                self.last_error = str(e)
+                self.next_refresh_at = time.time() + GIORNATA_SCHEDULE_RETRY
+            logger.error(f"❌ Errore caricamento calendario giornate: {e}")
+            return False
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+        teams = {}
+        for row in rows:
+            giornata = clean_giornata_number(row.get('giornata'))
+            if row.get('aurora_team') and row.get('date') and giornata:
+                teams.setdefault(row['aurora_team'], []).append((str(row['date'])[:10], giornata, row.get('opponent') or ''))
+
+        with self.lock:
+            self.teams = teams
+            self.loaded_at = time.time()
+            self.next_refresh_at = self.loaded_at + self.ttl
+            self.last_error = None
+            self.refresh_count += 1
+
+        logger.info(f"📅 Calendario giornate caricato: {len(rows)} partite, {len(teams)} squadre ({(time.time() - started) * 1000:.0f}ms)")
+        return True
+
+    def refresh_async(self):
+        """Aggiorna in background, senza bloccare chi sta costruendo un URL"""
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, name="giornata-schedule", daemon=True).start()
+
+    def _ensure_loaded(self):
+        # Primo uso: caricamento sincrono. Poi il calendario scaduto viene servito
+        # mentre quello nuovo si carica in background
+        if self.next_refresh_at is None:
+            with self.lock:
+                self.refreshing = True
+            self.refresh()
+        elif time.time() > self.next_refresh_at:
+            self.refresh_async()
+
+    def current_giornata(self, aurora_team, today=None):
+        """
+        Giornata della prossima partita da oggi in poi; se la stagione è finita
+        quella dell'ultima partita disponibile
+        """
+        self._ensure_loaded()
+        today = today or datetime.now().strftime('%Y-%m-%d')
+
+        with self.lock:
+            matches = self.teams.get(aurora_team, [])
+        for match_date, giornata, _ in matches:
+            if match_date >= today:
+                return giornata
+        return matches[-1][1] if matches else None
+
+    def match_giornata(self, aurora_team, opponent, day=None):
+        """
+        (data, giornata) della partita contro opponent giocata entro day compreso
+        (al massimo MATCH_LOOKUP_DAYS prima). Più categorie condividono lo stesso
+        aurora_team (ALLIEVI U18/U17/U16): l'avversario, riconosciuto con l'indice
+        dei nomi, sceglie la riga. None se non c'è o se resta ambigua
+        """
+        self._ensure_loaded()
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        try:
+            earliest = (datetime.strptime(day, '%Y-%m-%d') - timedelta(days=MATCH_LOOKUP_DAYS)).strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+
+        with self.lock:
+            matches = self.teams.get(aurora_team, [])
+        by_opponent = {}
+        for match_date, giornata, match_opponent in matches:
+            if earliest <= match_date <= day and match_opponent:
+                by_opponent.setdefault(match_opponent, []).append((match_date, giornata))
+
+        entry = TeamIndex({name: {} for name in by_opponent}).lookup(opponent) if by_opponent else None
+        if not entry:
+            return None
+        candidates = by_opponent[entry[0]]
+        # Stesso avversario in due categorie nella stessa finestra: giornata non determinabile
+        if len({giornata for _, giornata in candidates}) > 1:
+            return None
+        return candidates[-1]
+
+    def status(self, team_names=None):
+        """Stato del calendario con giornata prossima e ultima per squadra"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        with self.lock:
+            teams = dict(self.teams)
+            loaded_at = self.loaded_at
+
+        schedule = {}
+        for aurora_team in sorted(set(teams) | set(team_names or [])):
+            matches = teams.get(aurora_team, [])
+            upcoming = next(((date, giornata) for date, giornata, _ in matches if date >= today), None)
+            recent = next(((date, giornata) for date, giornata, _ in reversed(matches) if date < today), None)
+            schedule[aurora_team] = {
+                "current_giornata": upcoming[1] if upcoming else (matches[-1][1] if matches else None),
+                "upcoming": {"date": upcoming[0], "giornata": upcoming[1]} if upcoming else None,
+                "most_recent": {"date": recent[0], "giornata": recent[1]} if recent else None,
+                "matches": len(matches),
+            }
+
+        return {
+            "loaded_at": loaded_at,
+            "age_seconds": round(time.time() - loaded_at, 1) if loaded_at else None,
+            "ttl_seconds": self.ttl,
+            "refresh_count": self.refresh_count,
+            "last_error": self.last_error,
+            "teams": schedule,
+        }
+
+
+giornata_schedule = GiornataSchedule()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Codifica JSON delle risposte - Aurora Seriate 1967
+orjson quando installato (molto più veloce), altrimenti la libreria standard.
+I corpi delle risposte servite dalla cache vengono codificati una volta per
+versione (e compressi con gzip se servono a qualcuno): un cache hit diventa
+la copia di bytes già pronti invece di una nuova serializzazione
+"""
+
+import os
+import json
+import gzip
+import threading
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+GZIP_MIN_BYTES = int(os.environ.get("GZIP_MIN_BYTES", 1024))  # Sotto questa soglia gzip non conviene
+GZIP_LEVEL = 6
+
+
+def dumps(obj, sort_keys=False):
+    """Serializza in bytes UTF-8 (valori non JSON convertiti con str)"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=str, option=option)
+    return json.dumps(obj, default=str, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class EncodedBody:
+    """Corpo JSON già codificato, con la versione gzip calcolata alla prima richiesta"""
+
+    __slots__ = ("raw", "_gzipped")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._gzipped = None
+
+    @property
+    def compressible(self):
+        return len(self.raw) >= GZIP_MIN_BYTES
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.raw, compresslevel=GZIP_LEVEL, mtime=0)
+        return self._gzipped
+
+
+class EncodedResponses:
+    """Corpi codificati per chiave, validi finché non cambia la versione (ETag) della voce"""
+
+    def __init__(self):
+        self.bodies = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, build):
+        """Ritorna l'EncodedBody per (key, version), codificando build() solo alla prima richiesta"""
+        entry = self.bodies.get(key)
+        if entry and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        body = EncodedBody(build())
+        with self.lock:
+            self.bodies[key] = (version, body)
+            self.misses += 1
+        return body
+
+    def clear(self):
+        with self.lock:
+            self.bodies.clear()
+
+    def status(self):
+        return {
+            "encoder": "orjson" if ORJSON_AVAILABLE else "json",
+            "entries": len(self.bodies),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Configurazione del logging - Aurora Seriate 1967
+Livello da LOG_LEVEL (INFO in produzione: il dettaglio per riga dello scraper
+è a DEBUG e costa zero) e formato da LOG_FORMAT: "text" per la console,
+"json" per una riga JSON per evento, filtrabile dai log di Render
+"""
+
+import os
+import time
+import logging
+
+from json_codec import dumps as json_dumps
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+
+# Attributi standard di LogRecord: tutto il resto arriva da extra= e finisce nel JSON
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una riga JSON per evento con i campi passati in extra="""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json_dumps(entry).decode("utf-8")
+
+
+def configure_logging():
+    """Handler sulla root (una sola volta per processo) con livello e formato dall'ambiente"""
+    root = logging.getLogger()
+    if getattr(root, "_aurora_configured", False):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    root.handlers = [handler]
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    root._aurora_configured = True
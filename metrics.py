@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Metriche in formato Prometheus - Aurora Seriate 1967
+Contatori e istogrammi in memoria (un lock e un bisect per osservazione, si
+possono lasciare sempre attivi). Con più worker gunicorn ogni processo scrive
+periodicamente un'istantanea in METRICS_DIR/<pid>.json; /metrics somma quelle
+dei worker fratelli (stesso processo padre) alle proprie. Contatori e istogrammi
+dei worker terminati restano nella somma, i gauge solo per i processi vivi
+"""
+
+import os
+import time
+import json
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+from json_codec import dumps as json_dumps
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_DIR = os.environ.get("METRICS_DIR", "/tmp/aurora_metrics")
+METRICS_SNAPSHOT_SECONDS = float(os.environ.get("METRICS_SNAPSHOT_SECONDS", 5))  # Scrittura dell'istantanea del worker
+
+PREFIX = "aurora_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Secondi: dalle risposte dalla cache (ms) agli scraping con Chrome (minuti)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def export(self):
+        with self.lock:
+            values = [[list(key), value[:] if isinstance(value, list) else value] for key, value in self.values.items()]
+        return {"kind": self.kind, "help": self.documentation, "labels": list(self.labelnames), "values": values}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """Istogramma a bucket fissi: per etichette [conteggi per bucket..., +Inf, somma]"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, seconds, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def export(self):
+        exported = super().export()
+        exported["buckets"] = list(self.buckets)
+        return exported
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(target, source):
+    """Somma l'export di una metrica di un altro worker in target (stessa forma)"""
+    values = {tuple(key): value for key, value in target["values"]}
+    for key, value in source["values"]:
+        key = tuple(key)
+        current = values.get(key)
+        if current is None:
+            values[key] = value
+        elif isinstance(current, list):
+            values[key] = [a + b for a, b in zip(current, value)]
+        else:
+            values[key] = current + value
+    target["values"] = [[list(key), value] for key, value in values.items()]
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Metriche del processo, istantanee per worker e testo Prometheus aggregato"""
+
+    def __init__(self, directory=METRICS_DIR, interval=METRICS_SNAPSHOT_SECONDS):
+        self.metrics = {}
+        self.collectors = []
+        self.directory = directory
+        self.interval = interval
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, fn):
+        """fn() aggiorna i gauge subito prima di ogni istantanea (es. dimensione del pool)"""
+        self.collectors.append(fn)
+
+    def snapshot(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.debug("📈 Collector metriche fallito: %s", e)
+        return {
+            "pid": os.getpid(),
+            "ppid": os.getppid(),
+            "written_at": time.time(),
+            "metrics": {name: metric.export() for name, metric in list(self.metrics.items())},
+        }
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def write_snapshot(self, snapshot=None):
+        """Scrittura atomica dell'istantanea del worker (rename), letta dagli altri worker"""
+        snapshot = snapshot or self.snapshot()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(snapshot["pid"])
+            temporary = f"{path}.{threading.get_ident()}.tmp"  # Thread di snapshot e /metrics possono scrivere insieme
+            with open(temporary, "wb") as f:
+                f.write(json_dumps(snapshot))
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.debug("📈 Istantanea metriche non scritta: %s", e)
+
+    def start(self):
+        """Thread daemon che scrive l'istantanea ogni interval secondi (una sola volta)"""
+        if not METRICS_ENABLED or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.write_snapshot()
+
+    def _sibling_snapshots(self, own):
+        """Istantanee degli altri worker dello stesso server (stesso processo padre)"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+
+        snapshots = []
+        for name in names:
+            if not name.endswith(".json") or name == f"{own['pid']}.json":
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    snapshot = json.loads(f.read())
+            except (OSError, ValueError):
+                continue
+            if snapshot.get("ppid") != own["ppid"]:
+                continue  # Avvio precedente del server: non va sommato
+            snapshot["alive"] = _pid_alive(snapshot["pid"])
+            snapshots.append(snapshot)
+        return snapshots
+
+    def aggregate(self):
+        """Metriche del processo più quelle dei worker fratelli"""
+        own = self.snapshot()
+        self.write_snapshot(own)
+        merged = own["metrics"]
+        for snapshot in self._sibling_snapshots(own):
+            for name, exported in snapshot["metrics"].items():
+                if exported["kind"] == "gauge" and not snapshot["alive"]:
+                    continue
+                if name not in merged:
+                    merged[name] = {**exported, "values": []}
+                _merge(merged[name], exported)
+        return merged
+
+    def render(self):
+        """Testo in formato di esposizione Prometheus (0.0.4)"""
+        lines = []
+        for name, exported in sorted(self.aggregate().items()):
+            names = exported["labels"]
+            lines.append(f"# HELP {name} {exported['help']}")
+            lines.append(f"# TYPE {name} {exported['kind']}")
+            for key, value in sorted(exported["values"]):
+                if exported["kind"] != "histogram":
+                    lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(exported["buckets"] + ["+Inf"], value[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(float(bound))
+                    bucket_labels = _labels(names, key, f'le="{le}"')
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_labels(names, key)} {_number(float(value[-1]))}")
+                lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Metriche condivise da server e scraper
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Latenza delle richieste per endpoint (fino agli header)", ("endpoint", "method"))
+HTTP_RESPONSES = registry.counter(
+    "http_responses_total", "Risposte per endpoint e status", ("endpoint", "status"))
+SCRAPE_SECONDS = registry.histogram(
+    "scrape_duration_seconds", "Durata di uno scraping per categoria e motore", ("operation", "category", "engine"))
+SCRAPES = registry.counter(
+    "scrapes_total", "Scraping per esito", ("operation", "engine", "outcome"))
+PAGE_LOAD_SECONDS = registry.histogram(
+    "page_load_duration_seconds", "Caricamento di una pagina tuttocampo", ("engine",))
+PARSE_SECONDS = registry.histogram(
+    "parse_duration_seconds", "Estrazione dei dati da una pagina caricata", ("parser",))
+UPSTREAM_RESPONSES = registry.counter(
+    "upstream_http_responses_total", "Risposte HTTP di tuttocampo per status (error: nessuna risposta)", ("status",))
+SUPABASE_QUERY_SECONDS = registry.histogram(
+    "supabase_query_duration_seconds", "Durata delle query Supabase", ("query",))
+CACHE_LOOKUPS = registry.counter(
+    "cache_lookups_total", "Letture della cache per classe di chiave", ("key_class", "result"))
+BROWSER_CHECKOUT_SECONDS = registry.histogram(
+    "browser_checkout_wait_seconds", "Attesa di una sessione browser dal pool", ("source",))
+BROWSER_POOL = registry.gauge(
+    "browser_pool_browsers", "Browser del pool per stato", ("state",))
+BROWSER_RECYCLES = registry.counter(
+    "browser_recycles_total", "Browser riciclati per motivo", ("reason",))
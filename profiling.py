@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Profiling su richiesta - Aurora Seriate 1967
+Quando una categoria rallenta in produzione: un solo scraping sotto cProfile
+(output pstats o .prof per snakeviz/flameprof) oppure sotto un campionatore di
+stack (sys._current_frames) che produce "collapsed stacks" per flamegraph.pl
+o speedscope, per una chiamata o per tutto il processo per N secondi.
+I timer sempre attivi avvolgono poche funzioni calde e finiscono in /metrics
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import tempfile
+import functools
+import threading
+from io import StringIO
+from collections import Counter
+
+from metrics import registry as metrics_registry
+
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))  # Secondi tra due campioni
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 60))  # Tetto al campionamento del processo
+PROFILE_PSTATS_LIMIT = 60  # Righe della tabella pstats
+
+# Metodi dello scraper avvolti in timer sempre attivi (nomi separati da virgola)
+PROFILE_TIMED_FUNCTIONS = [
+    name.strip()
+    for name in os.environ.get(
+        "PROFILE_TIMED_FUNCTIONS", "scrape_category_results,_extract_standings_from_page,_parse_match_text"
+    ).split(",")
+    if name.strip()
+]
+
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLING = "sampling"
+
+FUNCTION_SECONDS = metrics_registry.histogram(
+    "function_duration_seconds", "Durata delle funzioni avvolte dai timer di profiling", ("function",))
+
+
+class ProfilerBusy(Exception):
+    """Un profiling è già in corso in questo worker: uno alla volta"""
+
+
+class ProfileReport:
+    """Risultato di un profiling: corpo, content type e durata"""
+
+    def __init__(self, mode, body, content_type, seconds, samples=None):
+        self.mode = mode
+        self.body = body
+        self.content_type = content_type
+        self.seconds = seconds
+        self.samples = samples
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Campiona gli stack dei thread ogni interval secondi su un thread dedicato.
+    Con thread_id campiona solo quel thread, altrimenti tutti (radice = nome del thread)
+    """
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.counts = Counter()
+        self.samples = 0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stopping.is_set():
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_id is not None and ident != self.thread_id):
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self.stopping.wait(self.interval)
+
+    def collapsed(self):
+        """Formato collapsed di flamegraph.pl: 'radice;...;foglia conteggio' per riga"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class Profiler:
+    """Un profiling alla volta per worker: cProfile o campionamento, di una chiamata o del processo"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def _exclusive(self):
+        if not self.lock.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is running in this worker")
+
+    def profile_call(self, mode, output, fn, *args, **kwargs):
+        """
+        Esegue fn nel thread corrente sotto il profiler, ritorna (risultato, ProfileReport).
+        output per cProfile: "pstats" (testo) o "prof" (file binario per snakeviz/flameprof)
+        """
+        self._exclusive()
+        started = time.time()
+        try:
+            if mode == MODE_SAMPLING:
+                sampler = StackSampler(thread_id=threading.get_ident()).start()
+                try:
+                    result = fn(*args, **kwargs)
+                finally:
+                    sampler.stop()
+                return result, ProfileReport(mode, sampler.collapsed(), "text/plain; charset=utf-8", time.time() - started, sampler.samples)
+
+            profile = cProfile.Profile()
+            result = profile.runcall(fn, *args, **kwargs)
+            return result, self._cprofile_report(profile, output, time.time() - started)
+        finally:
+            self.lock.release()
+
+    def sample_process(self, seconds):
+        """Campiona tutti i thread del processo per seconds secondi (al massimo PROFILE_MAX_SECONDS)"""
+        self._exclusive()
+        try:
+            seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+            sampler = StackSampler().start()
+            time.sleep(seconds)
+            sampler.stop()
+            return ProfileReport(MODE_SAMPLING, sampler.collapsed(), "text/plain; charset=utf-8", seconds, sampler.samples)
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def _cprofile_report(profile, output, seconds):
+        if output == "prof":
+            with tempfile.NamedTemporaryFile(suffix=".prof") as f:
+                profile.dump_stats(f.name)
+                return ProfileReport(MODE_CPROFILE, f.read(), "application/octet-stream", seconds)
+
+        text = StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(PROFILE_PSTATS_LIMIT)
+        return ProfileReport(MODE_CPROFILE, text.getvalue(), "text/plain; charset=utf-8", seconds)
+
+
+def timed(name):
+    """Timer sempre attivo: due perf_counter e un'osservazione dell'istogramma per chiamata"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                FUNCTION_SECONDS.observe(time.perf_counter() - started, function=name)
+        wrapper.__timed__ = True
+        return wrapper
+    return decorator
+
+
+def install_timers(cls, names=PROFILE_TIMED_FUNCTIONS):
+    """Avvolge i metodi indicati di cls nei timer (una sola volta), ritorna quelli avvolti"""
+    installed = []
+    for name in names:
+        method = cls.__dict__.get(name)
+        if not callable(method) or isinstance(method, (staticmethod, classmethod)) or getattr(method, "__timed__", False):
+            continue
+        setattr(cls, name, timed(f"{cls.__name__}.{name}")(method))
+        installed.append(name)
+    return installed
+
+
+profiler = Profiler()
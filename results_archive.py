@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Archivio locale dei risultati per data - Aurora Seriate 1967
+La pagina "Risultati" di tuttocampo mostra solo la giornata corrente: ogni
+scraping dei risultati del giorno viene quindi salvato in un file SQLite
+indicizzato per data e categoria. Le richieste per date passate vengono
+servite da qui in pochi millisecondi invece di riscaricare (male) la pagina;
+una data passata mai archiviata non ha risultati (404), non lo scraping live.
+In produzione RESULTS_ARCHIVE_PATH punta al disco persistente (render.yaml):
+il default in /tmp va bene solo in locale
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+RESULTS_ARCHIVE_PATH = os.environ.get("RESULTS_ARCHIVE_PATH", "/tmp/aurora_results_archive.db")
+
+
+def parse_day(value):
+    """Data YYYY-MM-DD valida oppure None"""
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def is_past_day(target_date):
+    """True per una data valida precedente a oggi"""
+    day = parse_day(target_date) if target_date else None
+    return bool(day) and day < datetime.now().strftime('%Y-%m-%d')
+
+
+def live_day(target_date):
+    """Giorno da archiviare per uno scraping live: solo oggi (la pagina mostra la giornata corrente)"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    if not target_date or parse_day(target_date) == today:
+        return today
+    return None
+
+
+class ResultsArchive:
+    """Risultati per (giorno, categoria, squadre) con l'ultimo snapshot di ogni partita"""
+
+    def __init__(self, path=RESULTS_ARCHIVE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    match_day TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    home_team TEXT NOT NULL,
+                    away_team TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    scraped_at REAL NOT NULL,
+                    PRIMARY KEY (match_day, category, home_team, away_team)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_day_category ON results (match_day, category)")
+            conn.execute("CREATE TABLE IF NOT EXISTS scraped_days (match_day TEXT PRIMARY KEY, scraped_at REAL NOT NULL, snapshots INTEGER NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def append(self, results, day=None):
+        """Aggiunge uno snapshot dei risultati del giorno (di default oggi)"""
+        day = parse_day(day) or datetime.now().strftime('%Y-%m-%d')
+        now = time.time()
+        rows = [
+            (
+                day,
+                result.get("category") or "",
+                result.get("home_team", result.get("homeTeam")) or "",
+                result.get("away_team", result.get("awayTeam")) or "",
+                json.dumps(result, default=str),
+                now,
+            )
+            for result in results
+        ]
+        if not rows:
+            return 0
+
+        try:
+            with self.lock, self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+                conn.execute(
+                    "INSERT INTO scraped_days (match_day, scraped_at, snapshots) VALUES (?, ?, 1) "
+                    "ON CONFLICT(match_day) DO UPDATE SET scraped_at = excluded.scraped_at, snapshots = snapshots + 1",
+                    (day, now)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"❌ Errore archivio risultati ({self.path}): {e}")
+            return 0
+        return len(rows)
+
+    def get_day(self, day):
+        """Ritorna (risultati, scraped_at) per un giorno archiviato, None se mai scaricato"""
+        day = parse_day(day)
+        if not day:
+            return None
+
+        try:
+            with self._connect() as conn:
+                scraped = conn.execute("SELECT scraped_at FROM scraped_days WHERE match_day = ?", (day,)).fetchone()
+                if not scraped:
+                    return None
+                rows = conn.execute(
+                    "SELECT payload FROM results WHERE match_day = ? ORDER BY category, rowid", (day,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Errore lettura archivio risultati ({self.path}): {e}")
+            return None
+
+        return [json.loads(row[0]) for row in rows], scraped[0]
+
+    def status(self):
+        try:
+            with self._connect() as conn:
+                days, first_day, last_day = conn.execute("SELECT COUNT(*), MIN(match_day), MAX(match_day) FROM scraped_days").fetchone()
+                results = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        except sqlite3.Error as e:
+            return {"path": self.path, "error": str(e)}
+
+        return {"path": self.path, "days": days, "results": results, "first_day": first_day, "last_day": last_day}
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Scrittura dei risultati su Supabase - Aurora Seriate 1967
+Ogni scraping riuscito finisce anche nella tabella 'match_results', così l'app
+Flutter può leggere i risultati direttamente dal database. Le righe vengono
+accumulate e scritte con un solo upsert (per sweep o dopo pochi secondi),
+chiave: categoria, giornata e squadre
+"""
+
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from supabase_client import get_supabase_client
+from metrics import SUPABASE_QUERY_SECONDS
+from tracing import span
+from giornata_schedule import giornata_schedule
+from team_names import normalize_team_name
+
+logger = logging.getLogger(__name__)
+
+RESULTS_WRITE_THROUGH = os.environ.get("RESULTS_WRITE_THROUGH", "true").lower() == "true"
+RESULTS_FLUSH_DELAY = float(os.environ.get("RESULTS_FLUSH_DELAY", 5))  # Attesa prima dell'upsert
+RESULTS_BATCH_SIZE = int(os.environ.get("RESULTS_BATCH_SIZE", 100))  # Upsert immediato oltre questa soglia
+RESULTS_RETRY_DELAY = 60  # Nuovo tentativo dopo un errore di scrittura
+RESULTS_MAX_PENDING = 1000  # Righe tenute in attesa se il database non risponde
+
+RESULTS_TABLE = "match_results"
+RESULTS_CONFLICT_COLUMNS = "category,round,home_team,away_team"
+
+# Stati dello scraper -> MatchStatus dell'app Flutter
+STATUS_MAP = {
+    "finita": "finished",
+    "finished": "finished",
+    "in corso": "in_progress",
+    "in_progress": "in_progress",
+    "rinviata": "postponed",
+    "postponed": "postponed",
+    "non iniziata": "not_started",
+    "not_started": "not_started",
+}
+# Note dei dati generati quando lo scraping reale non è disponibile: mai salvati
+PLACEHOLDER_NOTES = ("Modalità", "Dati temporanei")
+
+
+def is_persistable(result):
+    """True per i risultati veri, False per errori e dati di fallback"""
+    if not isinstance(result, dict) or "error" in result:
+        return False
+    note = str(result.get("note", ""))
+    return not any(marker in note for marker in PLACEHOLDER_NOTES)
+
+
+def _opponent(home_team, away_team):
+    """La squadra che non è Aurora, None se nessuna delle due (o entrambe) lo è"""
+    home_aurora = "aurora" in normalize_team_name(home_team)
+    away_aurora = "aurora" in normalize_team_name(away_team)
+    if home_aurora == away_aurora:
+        return None
+    return away_team if home_aurora else home_team
+
+
+class ResultsStore:
+    """Buffer delle righe 'match_results' con upsert a micro-batch"""
+
+    def __init__(self, category_to_team, enabled=RESULTS_WRITE_THROUGH):
+        self.category_to_team = category_to_team
+        self.enabled = enabled
+        self.pending = {}
+        self.timer = None
+        self.open_sweeps = 0
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "failures": 0, "skipped": 0}
+        self.last_error = None
+        self.last_flush_ms = None
+
+    def to_row(self, result, target_date=None):
+        """
+        Riga 'match_results' da un risultato (camelCase o snake_case). Giornata e
+        data vengono dal calendario: la partita della squadra contro lo stesso
+        avversario entro il giorno del risultato (o target_date, o oggi). None se il
+        calendario non la conosce o è ambiguo: la giornata è nella chiave
+        dell'upsert, meglio nessuna riga che una sbagliata
+        """
+        category = result.get("category")
+        home_team = result.get("homeTeam", result.get("home_team"))
+        away_team = result.get("awayTeam", result.get("away_team"))
+        opponent = _opponent(home_team, away_team)
+        if not opponent:
+            return None
+
+        result_date = result.get("match_date") or result.get("matchDate") or target_date or datetime.now().strftime("%Y-%m-%d")
+        aurora_team = self.category_to_team.get(category, category)
+        played = giornata_schedule.match_giornata(aurora_team, opponent, str(result_date)[:10])
+        if not played:
+            return None
+        match_date, giornata = played
+        status = str(result.get("status", "finita")).lower()
+
+        return {
+            "home_team": home_team,
+            "away_team": away_team,
+            "home_score": result.get("homeScore", result.get("home_score")),
+            "away_score": result.get("awayScore", result.get("away_score")),
+            "match_date": match_date,
+            "championship": result.get("championship"),
+            "category": category,
+            "round": giornata,
+            "home_position": result.get("homePosition", result.get("home_position")),
+            "away_position": result.get("awayPosition", result.get("away_position")),
+            "status": STATUS_MAP.get(status, "finished"),
+        }
+
+    def add(self, results, target_date=None):
+        """Accoda i risultati veri; l'upsert parte dopo RESULTS_FLUSH_DELAY o a batch pieno"""
+        if not self.enabled:
+            return
+
+        rows = []
+        for result in results:
+            row = self.to_row(result, target_date) if is_persistable(result) and result.get("category") else None
+            if row:
+                rows.append(row)
+            else:
+                self.stats["skipped"] += 1
+        if not rows:
+            return
+
+        with self.lock:
+            for row in rows:
+                self.pending[self._row_key(row)] = row
+            self.stats["queued"] += len(rows)
+            flush_now = len(self.pending) >= RESULTS_BATCH_SIZE
+            if not flush_now and not self.open_sweeps:
+                self._schedule(RESULTS_FLUSH_DELAY)
+
+        if flush_now:
+            self.flush()
+
+    @contextmanager
+    def sweep(self):
+        """Durante uno sweep le righe si accumulano: un solo upsert alla fine"""
+        with self.lock:
+            self.open_sweeps += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.open_sweeps -= 1
+                last = self.open_sweeps == 0
+            if last:
+                self.flush()
+
+    def flush(self):
+        """Scrive tutte le righe in attesa con un solo upsert"""
+        with self.flush_lock:
+            with self.lock:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+                batch = self.pending
+                self.pending = {}
+            if not batch:
+                return 0
+
+            started = time.time()
+            try:
+                with span("supabase.match_results_upsert", rows=len(batch)), SUPABASE_QUERY_SECONDS.time(query="match_results_upsert"):
+                    get_supabase_client().table(RESULTS_TABLE).upsert(list(batch.values()), on_conflict=RESULTS_CONFLICT_COLUMNS).execute()
+            except Exception as e:
+                logger.error(f"❌ Errore scrittura {len(batch)} risultati su {RESULTS_TABLE}: {e}")
+                with self.lock:
+                    # Le righe più recenti già in coda prevalgono su quelle fallite
+                    merged = dict(batch)
+                    merged.update(self.pending)
+                    self.pending = dict(list(merged.items())[-RESULTS_MAX_PENDING:])
+                    self.stats["failures"] += 1
+                    self.last_error = str(e)
+                    self._schedule(RESULTS_RETRY_DELAY)
+                return 0
+
+            self.last_flush_ms = round((time.time() - started) * 1000, 1)
+            with self.lock:
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                self.last_error = None
+            logger.info(f"💾 {len(batch)} risultati scritti su {RESULTS_TABLE} ({self.last_flush_ms}ms)")
+            return len(batch)
+
+    def status(self):
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "table": RESULTS_TABLE,
+                "pending": len(self.pending),
+                "flush_delay_seconds": RESULTS_FLUSH_DELAY,
+                "last_flush_ms": self.last_flush_ms,
+                "last_error": self.last_error,
+                "stats": dict(self.stats),
+            }
+
+    def _schedule(self, delay):
+        # Chiamato con self.lock acquisito: un solo timer alla volta
+        if self.timer is None:
+            self.timer = threading.Timer(delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    @staticmethod
+    def _row_key(row):
+        return (row["category"], row["round"], row["home_team"], row["away_team"])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Job asincroni per gli sweep lunghi - Aurora Seriate 1967
+Le richieste lunghe (scrape di tutte le categorie, aggiornamento classifiche)
+vengono accodate su un executor limitato: il thread della richiesta HTTP
+viene liberato subito e il client interroga lo stato del job
+"""
+
+import os
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", 1))  # Sweep in parallelo per worker
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 8))  # Job accodati + in esecuzione
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", 3600))  # 1 ora di conservazione risultati
+
+
+class JobRejected(Exception):
+    """Sollevata quando la coda dei job è piena"""
+
+
+class ScrapeJob:
+    """Stato di un singolo job: avanzamento per categoria e risultato finale"""
+
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.params = params
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def update_progress(self, category, status, error=None):
+        """Aggiorna lo stato di una categoria (pending, running, done, error)"""
+        with self._lock:
+            entry = self.progress.setdefault(category, {"status": "pending"})
+            entry["status"] = status
+            if status == "running":
+                entry["started_at"] = time.time()
+            elif status in ("done", "error"):
+                entry["finished_at"] = time.time()
+            if error:
+                entry["error"] = error
+
+    def is_expired(self, now=None):
+        if self.finished_at is None:
+            return False
+        return (now or time.time()) - self.finished_at > JOB_RESULT_TTL
+
+    def to_dict(self, include_result=True):
+        with self._lock:
+            progress = {category: dict(entry) for category, entry in self.progress.items()}
+
+        done = sum(1 for entry in progress.values() if entry["status"] in ("done", "error"))
+        data = {
+            "job_id": self.id,
+            "type": self.type,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": progress,
+            "completed_steps": done,
+            "total_steps": len(progress),
+        }
+        if self.finished_at is not None:
+            data["expires_at"] = self.finished_at + JOB_RESULT_TTL
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.status == "completed":
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Registro dei job con executor a dimensione fissa e scadenza dei risultati"""
+
+    def __init__(self, max_workers=JOB_MAX_WORKERS, max_pending=JOB_MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape-job")
+        self.max_pending = max_pending
+        self.jobs = {}
+        self.runners = {}
+        self.lock = threading.Lock()
+
+    def register(self, job_type, runner):
+        """Registra una funzione runner(job, params) per un tipo di job"""
+        self.runners[job_type] = runner
+
+    def submit(self, job_type, params):
+        """Accoda un job e ritorna subito l'oggetto ScrapeJob"""
+        if job_type not in self.runners:
+            raise ValueError(f"Job type '{job_type}' not supported. Supported: {sorted(self.runners)}")
+
+        with self.lock:
+            self._purge_expired()
+            active = sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
+            if active >= self.max_pending:
+                raise JobRejected(f"Job queue full ({active} active jobs)")
+
+            job = ScrapeJob(job_type, params)
+            self.jobs[job.id] = job
+
+        self.executor.submit(self._run, job)
+        logger.info(f"📥 Job {job.id} ({job_type}) accodato")
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            self._purge_expired()
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            self._purge_expired()
+            return list(self.jobs.values())
+
+    def _run(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        logger.info(f"🏃 Job {job.id} ({job.type}) avviato")
+
+        try:
+            job.result = self.runners[job.type](job, job.params)
+            job.status = "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            logger.error(f"❌ Job {job.id} fallito: {e}")
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"🏁 Job {job.id} terminato: {job.status} ({job.finished_at - job.started_at:.2f}s)")
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items() if job.is_expired(now)]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Coordinamento dello scraping tra più istanze - Aurora Seriate 1967
+Ogni chiave (categoria, classifica, risultati del giorno) viene scaricata da un
+solo nodo alla volta grazie a un lease con scadenza; gli altri nodi leggono il
+risultato condiviso invece di colpire di nuovo tuttocampo.
+
+Backend (variabile SCRAPE_LEASE_BACKEND):
+    none   - nessun coordinamento, solo lock in-process (default)
+    sqlite - file SQLite condiviso: worker gunicorn dello stesso container o test locali
+    redis  - Redis (SET NX PX), per più istanze in produzione
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import logging
+
+from deadlines import check_deadline
+from tracing import span
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_LEASE_BACKEND = os.environ.get("SCRAPE_LEASE_BACKEND", "none").lower()
+SCRAPE_LEASE_URL = os.environ.get("SCRAPE_LEASE_URL", "")
+SCRAPE_LEASE_TTL = float(os.environ.get("SCRAPE_LEASE_TTL", 120))  # Durata massima di uno scraping
+SCRAPE_LEASE_WAIT = float(os.environ.get("SCRAPE_LEASE_WAIT", 90))  # Attesa massima del risultato altrui
+SCRAPE_LEASE_POLL = 0.5
+
+# Errori del backend che fanno ripiegare sullo scraping locale
+BACKEND_ERRORS = (sqlite3.Error, OSError, RuntimeError) + ((redis.RedisError,) if REDIS_AVAILABLE else ())
+
+
+class LocalLeaseBackend:
+    """Lease e risultati in memoria: coordina solo i thread dello stesso processo"""
+
+    name = "none"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.leases = {}
+        self.results = {}
+
+    def acquire(self, key, owner, ttl):
+        with self.lock:
+            holder = self.leases.get(key)
+            if holder and holder[1] > time.time() and holder[0] != owner:
+                return False
+            self.leases[key] = (owner, time.time() + ttl)
+            return True
+
+    def release(self, key, owner):
+        with self.lock:
+            if self.leases.get(key, (None,))[0] == owner:
+                del self.leases[key]
+
+    def get_result(self, key):
+        with self.lock:
+            entry = self.results.get(key)
+            if entry and entry[1] > time.time():
+                return entry[0]
+            return None
+
+    def put_result(self, key, value, ttl):
+        with self.lock:
+            self.results[key] = (value, time.time() + ttl)
+
+    def clear_results(self):
+        with self.lock:
+            self.results.clear()
+
+
+class SQLiteLeaseBackend:
+    """Lease e risultati su un file SQLite condiviso (stand-in locale di un lock distribuito)"""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path or "/tmp/aurora_scrape_leases.db"
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def acquire(self, key, owner, ttl):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            conn.execute("INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)", (key, owner, now + ttl))
+            row = conn.execute("SELECT owner FROM leases WHERE key = ?", (key,)).fetchone()
+            conn.execute("COMMIT")
+            return bool(row) and row[0] == owner
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release(self, key, owner):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def get_result(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM results WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_result(self, key, value, ttl):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, payload, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+
+    def clear_results(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+
+class RedisLeaseBackend:
+    """Lease con SET NX PX e rilascio atomico solo da parte del proprietario"""
+
+    name = "redis"
+
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("SCRAPE_LEASE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.release_script = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def acquire(self, key, owner, ttl):
+        return bool(self.client.set(f"aurora:lease:{key}", owner, nx=True, px=int(ttl * 1000)))
+
+    def release(self, key, owner):
+        self.release_script(keys=[f"aurora:lease:{key}"], args=[owner])
+
+    def get_result(self, key):
+        payload = self.client.get(f"aurora:result:{key}")
+        return json.loads(payload) if payload else None
+
+    def put_result(self, key, value, ttl):
+        self.client.set(f"aurora:result:{key}", json.dumps(value), px=int(ttl * 1000))
+
+    def clear_results(self):
+        for result_key in self.client.scan_iter("aurora:result:*"):
+            self.client.delete(result_key)
+
+
+def create_lease_backend(name=SCRAPE_LEASE_BACKEND, url=SCRAPE_LEASE_URL):
+    """
+    Backend configurato; se non si riesce a crearlo (pacchetto mancante, URL o file
+    non validi) lock solo in-process: il coordinamento non deve mai impedire l'avvio
+    """
+    try:
+        if name == "sqlite":
+            return SQLiteLeaseBackend(url)
+        if name == "redis":
+            return RedisLeaseBackend(url)
+    except Exception as e:
+        logger.warning(f"⚠️ Backend lease '{name}' non disponibile ({e}), solo lock in-process")
+    return LocalLeaseBackend()
+
+
+class ScrapeCoordinator:
+    """Esegue uno scraping per chiave su un solo nodo, gli altri leggono il risultato condiviso"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_lease_backend()
+        # Prefisso del nodo; il proprietario di un lease è sempre la singola chiamata a run()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"scraped": 0, "shared": 0, "waited": 0, "fail_open": 0, "backend_errors": 0}
+
+    def run(self, key, fn, result_ttl, share=bool, deadline=None):
+        """
+        Ritorna (valore, shared). shared=True quando il valore viene da un altro nodo.
+        In caso di errori del backend o attesa troppo lunga lo scraping avviene
+        comunque in locale: il coordinamento non deve mai bloccare il servizio.
+        Con una deadline l'attesa del risultato altrui non la supera mai
+        (DeadlineExceeded invece di uno scraping locale ormai inutile)
+        """
+        with span("lease", key=key) as lease_span:
+            value, shared = self._run_under_lease(key, fn, result_ttl, share, deadline)
+            if lease_span is not None:
+                lease_span.set(shared=shared)
+            return value, shared
+
+    def _new_owner(self):
+        """Token per una sola chiamata: due thread dello stesso processo non condividono il lease"""
+        return f"{self.owner}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+    def _run_under_lease(self, key, fn, result_ttl, share, deadline):
+        owner = self._new_owner()
+        acquired = False
+        try:
+            shared = self.backend.get_result(key)
+            if shared is not None:
+                self.stats["shared"] += 1
+                return shared, True
+
+            give_up_at = time.time() + SCRAPE_LEASE_WAIT
+            if deadline is not None:
+                give_up_at = min(give_up_at, deadline.expires_at)
+            while time.time() < give_up_at:
+                acquired = self.backend.acquire(key, owner, SCRAPE_LEASE_TTL)
+                if acquired:
+                    break
+
+                # Un altro nodo sta scaricando questa chiave: aspetta il suo risultato
+                self.stats["waited"] += 1
+                time.sleep(SCRAPE_LEASE_POLL)
+                shared = self.backend.get_result(key)
+                if shared is not None:
+                    self.stats["shared"] += 1
+                    return shared, True
+            else:
+                check_deadline(deadline, f"lease {key}")
+                logger.warning(f"⏳ Lease {key}: attesa scaduta, scraping locale")
+                self.stats["fail_open"] += 1
+
+        except BACKEND_ERRORS as e:
+            logger.warning(f"⚠️ Backend lease non disponibile ({e}), scraping locale")
+            self.stats["backend_errors"] += 1
+
+        if not acquired:
+            return fn(), False
+
+        try:
+            value = fn()
+        finally:
+            self._backend_call(self.backend.release, key, owner)
+
+        self.stats["scraped"] += 1
+        if share(value):
+            self._backend_call(self.backend.put_result, key, value, result_ttl)
+        return value, False
+
+    def _backend_call(self, method, *args):
+        try:
+            method(*args)
+        except BACKEND_ERRORS as e:
+            logger.warning(f"⚠️ Backend lease non disponibile ({e})")
+            self.stats["backend_errors"] += 1
+
+    def clear_results(self):
+        """Svuota i risultati condivisi (insieme a /cache/clear)"""
+        self._backend_call(self.backend.clear_results)
+
+    def status(self):
+        return {
+            "backend": self.backend.name,
+            "owner": self.owner,
+            "lease_ttl": SCRAPE_LEASE_TTL,
+            "stats": dict(self.stats),
+        }
@@ -4,24 +4,56 @@ API Server per Selenium Scraping - Aurora Seriate 1967
 Espone le funzioni di scraping Selenium come API REST per l'app Flutter Android
 """
 
-from flask import Flask, jsonify, request
+import time
+IMPORT_STARTED_AT = time.time()  # Per /ready: tempi dall'import alla prima richiesta
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
+import os
 import threading
-import time
+import math
+import hashlib
+import hmac
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from scrape_jobs import JobManager, JobRejected
+from change_feed import create_change_feed
+from work_queue import ScrapeWorkQueue, Overloaded, PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND
+from scrape_leases import ScrapeCoordinator
+from supabase_client import get_supabase_client, status as database_status
+from giornata_schedule import giornata_schedule
+from team_names import team_index_for
+from results_store import ResultsStore, is_persistable
+from results_archive import ResultsArchive, is_past_day, live_day
+from json_codec import dumps as json_dumps, EncodedBody, EncodedResponses
+from deadlines import Deadline, DeadlineExceeded, DEADLINE_HEADER, DEADLINE_DEFAULTS
+from warm_up import WarmUp, WARM_UP_ON_IMPORT
+from browser_memory import BrowserMemoryGovernor
+from log_config import configure_logging
+from metrics import (registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_SECONDS,
+                     HTTP_RESPONSES, SUPABASE_QUERY_SECONDS, CACHE_LOOKUPS, BROWSER_CHECKOUT_SECONDS, BROWSER_POOL)
+from tracing import span, add_span, start_trace, finish_trace, exporter as trace_exporter, TRACE_HEADER
+from profiling import profiler, install_timers, ProfilerBusy, MODE_CPROFILE, MODE_SAMPLING
 # Import Selenium scraper
 try:
     from selenium_scraper import TuttocampoSeleniumScraper
     SELENIUM_AVAILABLE = True
+    install_timers(TuttocampoSeleniumScraper)  # Timer sempre attivi (PROFILE_TIMED_FUNCTIONS) in /metrics
 except ImportError:
     SELENIUM_AVAILABLE = False
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Write-through dei risultati su Supabase (tabella match_results)
+results_store = ResultsStore(TuttocampoSeleniumScraper.CATEGORY_TO_AURORA_TEAM if SELENIUM_AVAILABLE else {})
+# Archivio locale per data dei risultati Aurora (date passate senza scraping)
+results_archive = ResultsArchive()
+
+# Setup logging (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-CORS(app)  # Permette chiamate da Flutter app
+CORS(app, expose_headers=[TRACE_HEADER])  # Permette chiamate da Flutter app (che può leggere il trace id)
 
 # Cache ottimizzata per prestazioni
 scraping_cache = {}
@@ -29,74 +61,319 @@ CACHE_DURATION = 1800  # 30 minuti (le classifiche cambiano lentamente)
 STANDINGS_CACHE_DURATION = 3600  # 1 ora per le classifiche (ancora più stabili)
 FAST_CACHE_DURATION = 30  # 30 secondi per errori temporanei
 
+BATCH_MAX_ITEMS = 32  # Voci massime per richiesta /batch
+
+# Tetto globale di sessioni browser (pool + temporanei): oltre si attende o si rifiuta con 429
+BROWSER_SESSIONS_MAX = int(os.environ.get("BROWSER_SESSIONS_MAX", 2))
+BROWSER_SLOT_WAIT = float(os.environ.get("BROWSER_SLOT_WAIT", 20))  # Attesa massima di una sessione libera
+
+# Modalità budget (?budget_ms=): le categorie non pronte finiscono in background
+BUDGET_MAX_MS = 120000
+BUDGET_THREADS = int(os.environ.get("BUDGET_THREADS", 16))  # Scraping in background per categoria
+
+# Validatori HTTP (ETag, Last-Modified) calcolati una volta per versione di ogni voce di cache
+cache_validators = {}
+
+# Corpi delle risposte già codificati per versione: un cache hit non riserializza nulla
+PRESERIALIZED_RESPONSES = os.environ.get("PRESERIALIZED_RESPONSES", "true").lower() == "true"
+encoded_responses = EncodedResponses()
+
+# Endpoint di amministrazione (profiling): header X-Admin-Token, disattivati se vuoto
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+ADMIN_HEADER = "X-Admin-Token"
+
+def _cache_put(cache_key, data, timestamp=None):
+    """Salva una voce in cache e ne calcola ETag e Last-Modified"""
+    now = time.time()
+    scraping_cache[cache_key] = (data, now if timestamp is None else timestamp)
+
+    digest = hashlib.sha1(json_dumps(data, sort_keys=True)).hexdigest()[:20]
+    previous = cache_validators.get(cache_key)
+    # Last-Modified cambia solo quando cambiano davvero i dati
+    last_modified = previous[1] if previous and previous[0] == digest else now
+    cache_validators[cache_key] = (digest, last_modified)
+
+def _cache_key_class(cache_key):
+    """Classe della chiave per le metriche (il solo prefisso, senza categorie e date)"""
+    for prefix in ("standings_", "aurora_all_results_", "aurora_results_"):
+        if cache_key.startswith(prefix):
+            return prefix.rstrip("_")
+    return "results"
+
+def _cache_fresh(cache_key, duration):
+    """Voce di cache (data, timestamp) se più giovane di duration, altrimenti None; conta hit e miss"""
+    with span("cache.lookup", key=cache_key) as lookup_span:
+        entry = scraping_cache.get(cache_key)
+        fresh = entry is not None and time.time() - entry[1] < duration
+        if lookup_span is not None:
+            lookup_span.set(hit=fresh)
+    CACHE_LOOKUPS.inc(key_class=_cache_key_class(cache_key), result="hit" if fresh else "miss")
+    return entry if fresh else None
+
+def _cache_validators_for(cache_keys, values):
+    """
+    Validatori per una risposta costruita dalle voci indicate, solo se i dati
+    serviti sono esattamente quelli in cache (altrimenti None)
+    """
+    digests = []
+    last_modified = 0
+    for cache_key, value in zip(cache_keys, values):
+        entry = scraping_cache.get(cache_key)
+        validators = cache_validators.get(cache_key)
+        if not entry or not validators or entry[0] is not value:
+            return None
+        digests.append(validators[0])
+        last_modified = max(last_modified, validators[1])
+
+    etag = digests[0] if len(digests) == 1 else hashlib.sha1('|'.join(digests).encode('utf-8')).hexdigest()[:20]
+    return etag, last_modified
+
+def _json_response(body, status_code=200):
+    """Risposta da un EncodedBody, con gzip se il client lo accetta"""
+    if body.compressible and request.accept_encodings['gzip']:
+        response = Response(body.gzipped, status=status_code, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body.raw, status=status_code, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _validated_json(payload, validators, status_code=200, encoded_key=None):
+    """
+    jsonify con ETag/Last-Modified; 304 vuoto se il client ha già questa versione.
+    Con encoded_key il corpo viene codificato una sola volta per versione della voce
+    """
+    if validators and status_code == 200:
+        etag, last_modified = validators
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        elif request.if_modified_since:
+            not_modified = int(last_modified) <= request.if_modified_since.timestamp()
+        else:
+            not_modified = False
+
+        if not_modified:
+            response = Response(status=304)
+        elif isinstance(payload, EncodedBody):
+            response = _json_response(payload)
+        elif encoded_key and PRESERIALIZED_RESPONSES:
+            # Anche il timestamp della voce fa parte della versione del corpo
+            version = (etag, payload.get("timestamp"))
+            response = _json_response(encoded_responses.get(encoded_key, version, lambda: json_dumps(payload)))
+        else:
+            response = jsonify(payload)
+        response.set_etag(etag, weak=True)
+        response.last_modified = int(last_modified)
+        return response
+
+    return jsonify(payload), status_code
+
+def _request_deadline(endpoint):
+    """Scadenza della richiesta: header X-Request-Deadline-Ms o default dell'endpoint"""
+    return Deadline.from_header(request.headers.get(DEADLINE_HEADER), DEADLINE_DEFAULTS[endpoint])
+
+def _deadline_response(error):
+    """504: la scadenza è passata e il lavoro rimasto è stato abbandonato"""
+    logger.warning(f"⏰ {error}")
+    return jsonify({"success": False, "error": str(error), "deadline_exceeded": True}), 504
+
+def _overloaded_response(error):
+    """429 con Retry-After calcolato dalla coda: il client riprova invece di accumularsi"""
+    response = jsonify({"success": False, "error": str(error), "overloaded": True, "retry_after_seconds": error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def _admin_denied():
+    """Risposta di rifiuto per gli endpoint di amministrazione, None se il token è valido"""
+    if not ADMIN_TOKEN:
+        return jsonify({"success": False, "error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get(ADMIN_HEADER, "").encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"success": False, "error": "Invalid admin token"}), 403
+    return None
+
+def _stale_cache(cache_key):
+    """Voce di cache anche scaduta (data, timestamp), None se assente o vuota: sotto carico meglio vecchia che niente"""
+    entry = scraping_cache.get(cache_key)
+    if entry and entry[0] and not (isinstance(entry[0], dict) and "error" in entry[0]):
+        return entry
+    return None
+
+def _record_checkout(started, source):
+    """Attesa di una sessione browser (pool, nuovo o rifiutato): metrica e span"""
+    ended = time.time()
+    BROWSER_CHECKOUT_SECONDS.observe(ended - started, source=source)
+    add_span("browser.checkout", started, ended, source=source)
+
+def _pause(seconds, deadline=None):
+    """Pausa tra categorie che non supera la scadenza della richiesta"""
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
+
+# Categorie supportate dagli endpoint di scraping
+SUPPORTED_CATEGORIES = ['PROMOZIONE', 'U21', 'U19', 'U18', 'U17', 'U16', 'U15', 'U14']
+
 class ScrapingAPIServer:
     def __init__(self):
         # Pool di browser per riutilizzo (più veloce)
         self.scraper_pool = []
         self.pool_lock = threading.Lock()
-        self.max_pool_size = 2  # Max 2 browser simultanei
+        self.max_pool_size = BROWSER_SESSIONS_MAX  # Max browser simultanei (default 2)
+
+        # Sessioni browser in uso, temporanei compresi: mai oltre max_pool_size
+        self.browser_slots = threading.BoundedSemaphore(self.max_pool_size)
+        self.browsers_in_use = 0
+        self.active_scrapers = set()  # Browser fuori dal pool, per le misure di memoria
 
-        # Lock principale per coordinamento
-        self.scraper_lock = threading.Lock()
+        # Riciclo dei browser per RSS/navigazioni e niente temporanei sotto pressione di memoria
+        self.memory_governor = BrowserMemoryGovernor()
 
-        # Inizializza pool di browser
-        self._initialize_scraper_pool()
+        # Coda a priorità: tutto lo scraping passa da qui, un worker per browser del pool
+        self.work_queue = ScrapeWorkQueue(workers=self.max_pool_size)
+
+        # Lease per chiave: con più istanze ogni chiave viene scaricata da un solo nodo
+        self.coordinator = ScrapeCoordinator()
+
+        # Il pool di browser si inizializza nel warm-up in background, non all'import
 
     def _initialize_scraper_pool(self):
-        """Inizializza un pool di browser riutilizzabili"""
+        """Inizializza un pool di browser riutilizzabili, ritorna True se un browser è pronto"""
         if not SELENIUM_AVAILABLE:
-            print("🚧 Selenium non disponibile - modalità fallback attivata")
-            return
+            logger.warning("🚧 Selenium non disponibile - modalità fallback attivata")
+            return False
 
-        print("🏊‍♂️ Inizializzazione pool di browser per prestazioni ottimali...")
+        # Il primo browser occupa una sessione come gli altri: se le richieste
+        # arrivate durante il warm-up le usano già tutte, non serve crearne un altro
+        if not self.browser_slots.acquire(blocking=False):
+            logger.info("🏊‍♂️ Sessioni browser già in uso, pool inizializzato dalle richieste")
+            return True
+
+        logger.info("🏊‍♂️ Inizializzazione pool di browser per prestazioni ottimali...")
         try:
             # Crea il primo browser
             scraper = TuttocampoSeleniumScraper(headless=True)
             if scraper.start():
-                self.scraper_pool.append(scraper)
-                print("✅ Browser nel pool: 1")
-            else:
-                print("⚠️ Non è stato possibile inizializzare il browser pool")
+                with self.pool_lock:
+                    self.scraper_pool.append(scraper)
+                logger.info("✅ Browser nel pool: 1")
+                return True
+            logger.warning("⚠️ Non è stato possibile inizializzare il browser pool")
         except Exception as e:
-            print(f"⚠️ Errore inizializzazione pool: {e}")
+            logger.warning(f"⚠️ Errore inizializzazione pool: {e}")
+        finally:
+            self.browser_slots.release()
+        return False
+
+    def _get_scraper_from_pool(self, deadline=None):
+        """
+        Ottieni un browser dal pool o creane uno nuovo, entro il tetto globale di
+        sessioni: se nessuna si libera in tempo solleva Overloaded (429)
+        """
+        wait = BROWSER_SLOT_WAIT if deadline is None else min(BROWSER_SLOT_WAIT, deadline.remaining())
+        started = time.time()
+        if not self.browser_slots.acquire(timeout=wait):
+            _record_checkout(started, "rejected")
+            raise Overloaded(
+                f"All {self.max_pool_size} browser sessions busy, try again later",
+                self.work_queue.average_run_seconds(PRIORITY_INTERACTIVE)
+            )
 
-    def _get_scraper_from_pool(self):
-        """Ottieni un browser dal pool o creane uno nuovo"""
         with self.pool_lock:
+            self.browsers_in_use += 1
             if self.scraper_pool:
-                return self.scraper_pool.pop()
-            else:
-                # Crea nuovo browser se pool vuoto
-                print("🏁 Creazione browser temporaneo...")
-                scraper = TuttocampoSeleniumScraper(headless=True)
+                scraper = self.scraper_pool.pop()
+                self.active_scrapers.add(scraper)
+                _record_checkout(started, "pool")
                 return scraper
 
+        # Un nuovo Chrome con il container già quasi pieno finirebbe in un OOM kill
+        if self.memory_governor.under_pressure():
+            self._release_browser_slot()
+            raise Overloaded("Memory pressure, no browser available, try again later", self.work_queue.average_run_seconds(PRIORITY_INTERACTIVE))
+
+        try:
+            # Crea nuovo browser se pool vuoto (conta comunque nel tetto)
+            logger.info("🏁 Creazione browser temporaneo...")
+            scraper = TuttocampoSeleniumScraper(headless=True)
+        except Exception:
+            self._release_browser_slot()
+            raise
+        with self.pool_lock:
+            self.active_scrapers.add(scraper)
+        _record_checkout(started, "new")
+        return scraper
+
     def _return_scraper_to_pool(self, scraper):
-        """Restituisce un browser al pool per riutilizzo"""
+        """Restituisce un browser al pool per riutilizzo e libera la sessione"""
         with self.pool_lock:
-            if len(self.scraper_pool) < self.max_pool_size:
-                self.scraper_pool.append(scraper)
-            else:
-                # Pool pieno, chiudi browser
-                try:
-                    scraper.stop()
-                except:
-                    pass
+            self.active_scrapers.discard(scraper)
+            pool_has_room = len(self.scraper_pool) < self.max_pool_size
+
+        reason = self.memory_governor.recycle_reason(scraper) if pool_has_room else None
+        if reason:
+            # Il riavvio avviene in background e tiene la sessione fino alla fine
+            threading.Thread(target=self._recycle_scraper, args=(scraper, reason), name="browser-recycle", daemon=True).start()
+            return
+
+        try:
+            with self.pool_lock:
+                if len(self.scraper_pool) < self.max_pool_size:
+                    self.scraper_pool.append(scraper)
+                    return
+            # Pool pieno, chiudi browser
+            try:
+                scraper.stop()
+            except:
+                pass
+        finally:
+            self._release_browser_slot()
+
+    def _recycle_scraper(self, scraper, reason):
+        """Chiude un Chrome cresciuto troppo e lo riavvia pulito, se la memoria lo permette"""
+        logger.info(f"♻️ Riciclo browser: {reason}")
+        try:
+            try:
+                scraper.stop()
+            except Exception as e:
+                logger.warning(f"⚠️ Errore chiusura browser da riciclare: {e}")
+            if not self.memory_governor.under_pressure() and scraper.start():
+                with self.pool_lock:
+                    self.scraper_pool.append(scraper)
+                logger.info("✅ Browser riciclato e rimesso nel pool")
+        finally:
+            self._release_browser_slot()
+
+    def _release_browser_slot(self):
+        with self.pool_lock:
+            self.browsers_in_use -= 1
+        self.browser_slots.release()
+
+    def browser_status(self):
+        with self.pool_lock:
+            return {"max_sessions": self.max_pool_size, "in_use": self.browsers_in_use, "idle": len(self.scraper_pool)}
+
+    def browser_memory_status(self):
+        """RSS per browser (nel pool e in uso) e memoria del container"""
+        with self.pool_lock:
+            scrapers = [("idle", scraper) for scraper in self.scraper_pool]
+            scrapers += [("in_use", scraper) for scraper in self.active_scrapers]
+        return self.memory_governor.status(scrapers)
 
     def get_cached_result(self, category):
         """Controlla se abbiamo un risultato in cache ancora valido"""
-        if category in scraping_cache:
-            cached_data, timestamp = scraping_cache[category]
-            if time.time() - timestamp < CACHE_DURATION:
-                logger.info(f"Returning cached result for {category}")
-                return cached_data
+        entry = _cache_fresh(category, CACHE_DURATION)
+        if entry:
+            logger.info(f"Returning cached result for {category}")
+            return entry[0]
         return None
 
     def set_cache(self, category, data):
-        """Salva il risultato in cache"""
-        scraping_cache[category] = (data, time.time())
+        """Salva il risultato in cache e registra le differenze nel change feed"""
+        _cache_put(category, data)
+        change_feed.record_result(category, data)
 
-    def scrape_category_safe(self, category):
+    def scrape_category_safe(self, category, priority=PRIORITY_INTERACTIVE, deadline=None):
         """Scraping ottimizzato con pool di browser riutilizzabili"""
         start_time = time.time()
 
@@ -107,63 +384,157 @@ class ScrapingAPIServer:
                 logger.info(f"Cache hit for {category} (0.00s)")
                 return cached_result
 
-            # Scraping con timeout ridotto
-            if not self.scraper_lock.acquire(timeout=3):
-                logger.warning(f"Could not acquire lock for {category} within 3 seconds")
-                return {"error": "Server busy, try again later"}
-
-            scraper = None
-            try:
-                logger.info(f"Starting optimized scraping for {category}")
-
-                # Ottieni browser dal pool
-                scraper = self._get_scraper_from_pool()
-
-                # Se non è già avviato, avvialo
-                if not scraper.driver:
-                    if not scraper.start():
-                        logger.warning("🚨 Chrome fallito, attivazione modalità fallback per continuità servizio")
-                        return _get_fallback_data(category)
-
-                result = scraper.scrape_category_results(category)
-
-                if result:
-                    # Converte il risultato in formato JSON serializable
-                    json_result = {
-                        "homeTeam": result["homeTeam"],
-                        "awayTeam": result["awayTeam"],
-                        "homeScore": result["homeScore"],
-                        "awayScore": result["awayScore"],
-                        "category": result["category"],
-                        "championship": result["championship"]
-                    }
-
-                    # Salva in cache
-                    self.set_cache(category, json_result)
-
-                    elapsed = time.time() - start_time
-                    logger.info(f"⚡ Fast scraping {category}: {json_result['homeTeam']} {json_result['homeScore']}-{json_result['awayScore']} {json_result['awayTeam']} ({elapsed:.2f}s)")
-                    return json_result
-                else:
-                    error_msg = f"No results found for {category}"
-                    logger.warning(error_msg)
-                    return {"error": error_msg}
-
-            finally:
-                # Restituisci browser al pool invece di chiuderlo
-                if scraper:
-                    self._return_scraper_to_pool(scraper)
-                self.scraper_lock.release()
-
+            # Controllo di ammissione: con la coda satura meglio un 429 subito
+            self.work_queue.admit(priority, deadline)
+
+            # Lo scraping passa dalla coda a priorità (i worker limitano i browser in uso),
+            # sotto lease così che un solo nodo scarichi la categoria
+            result, shared = self.coordinator.run(
+                f"result:{category}",
+                lambda: self.work_queue.run_until(deadline, priority, self._scrape_category_uncached, category, start_time, deadline),
+                CACHE_DURATION,
+                share=lambda value: bool(value) and "error" not in value and "note" not in value,
+                deadline=deadline
+            )
+            if shared:
+                logger.info(f"🤝 Shared result for {category} from another instance")
+                self.set_cache(category, result)
+            return result
+
+        except DeadlineExceeded as e:
+            logger.warning(f"⏰ Scraping {category} abbandonato: {e}")
+            return {"error": str(e), "deadline_exceeded": True}
+        except Overloaded as e:
+            stale = _stale_cache(category)
+            if stale:
+                logger.info(f"🚦 Server saturo, risultato in cache scaduto per {category}")
+                return stale[0]
+            return {"error": str(e), "overloaded": True, "retry_after_seconds": e.retry_after}
         except Exception as e:
             elapsed = time.time() - start_time
             error_msg = f"Scraping error for {category}: {str(e)} ({elapsed:.2f}s)"
             logger.error(error_msg)
             return {"error": error_msg}
 
+    def _scrape_category_uncached(self, category, start_time, deadline=None):
+        """Scraping vero e proprio, eseguito da un worker della coda"""
+        scraper = None
+        try:
+            logger.info(f"Starting optimized scraping for {category}")
+
+            # Ottieni browser dal pool
+            scraper = self._get_scraper_from_pool(deadline)
+
+            # Se non è già avviato, avvialo
+            if not scraper.driver:
+                if not scraper.start():
+                    logger.warning("🚨 Chrome fallito, attivazione modalità fallback per continuità servizio")
+                    return _get_fallback_data(category)
+
+            result = scraper.scrape_category_results(category, deadline=deadline)
+
+            if result:
+                # Converte il risultato in formato JSON serializable
+                json_result = {
+                    "homeTeam": result["homeTeam"],
+                    "awayTeam": result["awayTeam"],
+                    "homeScore": result["homeScore"],
+                    "awayScore": result["awayScore"],
+                    "category": result["category"],
+                    "championship": result["championship"]
+                }
+
+                # Salva in cache e accoda la scrittura su Supabase
+                self.set_cache(category, json_result)
+                results_store.add([json_result])
+
+                elapsed = time.time() - start_time
+                logger.info(f"⚡ Fast scraping {category}: {json_result['homeTeam']} {json_result['homeScore']}-{json_result['awayScore']} {json_result['awayTeam']} ({elapsed:.2f}s)")
+                return json_result
+            else:
+                error_msg = f"No results found for {category}"
+                logger.warning(error_msg)
+                return {"error": error_msg}
+
+        finally:
+            # Restituisci browser al pool invece di chiuderlo
+            if scraper:
+                self._return_scraper_to_pool(scraper)
+
+# Change feed versionato dei risultati e delle classifiche (condiviso tra i worker se su SQLite)
+change_feed = create_change_feed()
+
 # Istanza globale del server
 scraping_server = ScrapingAPIServer()
 
+# Job asincroni per gli sweep lunghi (scrape/all, update-standings)
+job_manager = JobManager()
+
+# Warm-up in background: l'import resta veloce, il worker risponde subito
+warm_up = WarmUp(IMPORT_STARTED_AT)
+
+def _warm_http_libraries():
+    """Importa una volta le librerie usate dallo scraping HTTP (fuori dal percorso delle richieste)"""
+    import requests  # noqa: F401
+    import bs4  # noqa: F401
+
+def _warm_giornata_schedule():
+    if not giornata_schedule.refresh():
+        raise RuntimeError(giornata_schedule.last_error or "schedule not loaded")
+
+def _warm_browser_pool():
+    if not scraping_server._initialize_scraper_pool():
+        raise RuntimeError("Chrome not started, serving in fallback mode")
+
+warm_up.add_step("http_libraries", _warm_http_libraries)
+warm_up.add_step("supabase_client", get_supabase_client)
+warm_up.add_step("giornata_schedule", _warm_giornata_schedule)
+warm_up.add_step("browser_pool", _warm_browser_pool)
+
+@app.before_request
+def _record_first_request():
+    warm_up.mark_request()
+    g.request_started = time.perf_counter()
+    # Traccia della richiesta: X-Trace-Id/traceparent del client o un id nuovo
+    g.trace_root, g.trace_token = start_trace(
+        f"{request.method} {request.path}",
+        request.headers.get(TRACE_HEADER),
+        request.headers.get("traceparent"),
+        method=request.method,
+        path=request.full_path.rstrip("?"),
+    )
+
+@app.after_request
+def _record_request_metrics(response):
+    """Latenza (fino agli header, anche per le risposte in streaming) e status per regola di routing"""
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    started = g.get("request_started")
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    HTTP_RESPONSES.inc(endpoint=endpoint, status=response.status_code)
+
+    root = g.get("trace_root")
+    if root is not None:
+        root.set(endpoint=endpoint, status=response.status_code)
+        response.headers[TRACE_HEADER] = root.trace.trace_id
+    return response
+
+@app.teardown_request
+def _finish_request_trace(error=None):
+    root = g.pop("trace_root", None)
+    if root is not None:
+        if error is not None:
+            root.error = f"{type(error).__name__}: {error}"
+        finish_trace(root, g.pop("trace_token", None), trace_exporter)
+
+def _collect_browser_pool_metrics():
+    with scraping_server.pool_lock:
+        BROWSER_POOL.set(len(scraping_server.scraper_pool), state="idle")
+        BROWSER_POOL.set(scraping_server.browsers_in_use, state="in_use")
+    BROWSER_POOL.set(scraping_server.max_pool_size, state="max")
+
+metrics_registry.add_collector(_collect_browser_pool_metrics)
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint"""
@@ -173,12 +544,23 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "scrape_category": "/scrape/<category>",
             "scrape_all": "/scrape/all",
             "aurora_results": "/scrape/aurora-results",
             "standings": "/standings/<category>",
             "cache_status": "/cache/status",
-            "cache_clear": "/cache/clear"
+            "cache_clear": "/cache/clear",
+            "jobs_submit": "/jobs",
+            "job_status": "/jobs/<job_id>",
+            "changes": "/changes?since=<version>",
+            "batch": "/batch",
+            "queue_status": "/queue/status",
+            "browsers_memory": "/browsers/memory",
+            "metrics": "/metrics",
+            "traces": "/debug/traces",
+            "profile": "/debug/profile",
+            "schedule": "/schedule"
         }
     })
 
@@ -187,6 +569,13 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "ok", "service": "selenium-api-server"})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: 200 a warm-up finito (anche in fallback), 503 mentre browser e client si preparano"""
+    status = warm_up.status()
+    status["browsers"] = scraping_server.browser_status()
+    return jsonify(status), 200 if status["ready"] else 503
+
 @app.route('/scrape/<category>', methods=['GET'])
 def scrape_category(category):
     """
@@ -199,24 +588,27 @@ def scrape_category(category):
         category = category.upper()
         logger.info(f"API request for category: {category}")
 
-        # Lista delle categorie supportate
-        supported_categories = ['PROMOZIONE', 'U21', 'U19', 'U18', 'U17', 'U16', 'U15', 'U14']
-
-        if category not in supported_categories:
+        if category not in SUPPORTED_CATEGORIES:
             return jsonify({
-                "error": f"Category {category} not supported. Supported: {supported_categories}"
+                "error": f"Category {category} not supported. Supported: {SUPPORTED_CATEGORIES}"
             }), 400
 
         # Esegui scraping
-        result = scraping_server.scrape_category_safe(category)
-
+        result = scraping_server.scrape_category_safe(category, deadline=_request_deadline("scrape_category"))
+
+        if result.get("deadline_exceeded"):
+            return jsonify(result), 504
+        if result.get("overloaded"):
+            response = jsonify(result)
+            response.headers['Retry-After'] = str(result["retry_after_seconds"])
+            return response, 429
         if "error" in result:
             return jsonify(result), 500
         else:
-            return jsonify({
+            return _validated_json({
                 "success": True,
                 "data": result
-            })
+            }, _cache_validators_for([category], [result]), encoded_key=f"scrape:{category}")
 
     except Exception as e:
         logger.error(f"API error: {str(e)}")
@@ -227,50 +619,290 @@ def scrape_all_categories():
     """
     Endpoint per scraping di tutte le categorie
     GET /scrape/all
+    GET /scrape/all?stream=ndjson (oppure stream=sse) - un record per categoria appena pronta
+    GET /scrape/all?budget_ms=5000 - le categorie pronte entro il budget, le altre 'pending'
     """
     try:
-        logger.info("API request for all categories")
-        categories = ['PROMOZIONE', 'U21', 'U19', 'U18', 'U17', 'U16', 'U15', 'U14']
+        budget = _requested_budget()
+        if budget is not None:
+            logger.info(f"API request for all categories (budget: {budget:g}s)")
+            return _budgeted_response(*_scrape_categories_within_budget(SUPPORTED_CATEGORIES, budget))
 
-        results = {}
-        for category in categories:
-            logger.info(f"Scraping {category}...")
-            result = scraping_server.scrape_category_safe(category)
-            results[category] = result
+        deadline = _request_deadline("scrape_all")
+        stream_format = _requested_stream_format()
+        if stream_format:
+            logger.info(f"API request for all categories (stream: {stream_format})")
+            return _stream_response(_iter_category_records(SUPPORTED_CATEGORIES, deadline), stream_format)
 
-            # Piccola pausa tra categorie
-            time.sleep(2)
+        logger.info("API request for all categories")
+        results = _scrape_categories(SUPPORTED_CATEGORIES, deadline=deadline)
 
-        return jsonify({
+        return _validated_json({
             "success": True,
             "data": results
-        })
+        }, _cache_validators_for(SUPPORTED_CATEGORIES, [results[category] for category in SUPPORTED_CATEGORIES]), encoded_key="scrape:all")
 
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
     except Exception as e:
         logger.error(f"API error: {str(e)}")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+def _scrape_categories(categories, job=None, priority=PRIORITY_BATCH, deadline=None):
+    """
+    Scraping sequenziale di più categorie, con avanzamento opzionale su un job.
+    Con una deadline lo sweep si interrompe (DeadlineExceeded) alla scadenza
+    """
+    if job:
+        for category in categories:
+            job.update_progress(category, "pending")
+
+    results = {}
+    # Un solo upsert su Supabase per tutto lo sweep
+    with results_store.sweep():
+        for i, category in enumerate(categories):
+            if i > 0:
+                # Piccola pausa tra categorie (mai dopo l'ultima: alla scadenza perderebbe lo sweep)
+                _pause(2, deadline)
+            if deadline is not None:
+                deadline.check(f"scraping {category}")
+            logger.info(f"Scraping {category}...")
+            if job:
+                job.update_progress(category, "running")
+
+            result = scraping_server.scrape_category_safe(category, priority=priority, deadline=deadline)
+            results[category] = result
+
+            if job:
+                job.update_progress(category, "error" if "error" in result else "done", error=result.get("error"))
+
+    return results
+
+# Modalità budget per gli endpoint multi-categoria
+budget_executor = ThreadPoolExecutor(max_workers=BUDGET_THREADS, thread_name_prefix="budget-scrape")
+budget_inflight = {}  # chiave -> Future dello scraping in background
+budget_lock = threading.Lock()
+
+def _requested_budget():
+    """?budget_ms= in secondi (limitato a BUDGET_MAX_MS), None se assente o non valido"""
+    value = request.args.get('budget_ms')
+    try:
+        return min(max(int(value), 0), BUDGET_MAX_MS) / 1000 if value is not None else None
+    except ValueError:
+        return None
+
+def _submit_budgeted(key, fn, *args):
+    """Avvia fn in background, riusando lo scraping già in corso per la stessa chiave"""
+    with budget_lock:
+        future = budget_inflight.get(key)
+        if future is None:
+            # Il contesto porta lo span della richiesta nel thread di background
+            future = budget_executor.submit(contextvars.copy_context().run, fn, *args)
+            budget_inflight[key] = future
+            future.add_done_callback(lambda done, key=key: _forget_budgeted(key, done))
+        return future
+
+def _forget_budgeted(key, future):
+    with budget_lock:
+        if budget_inflight.get(key) is future:
+            del budget_inflight[key]
+
+def _collect_within_budget(tasks, budget):
+    """
+    Attende i Future per categoria al massimo budget secondi. Ritorna
+    (risultati delle categorie finite, categorie ancora in corso): queste
+    ultime continuano in background e riempiono la cache
+    """
+    if not tasks:
+        return {}, []
+    done, _ = wait_futures(list(tasks.values()), timeout=budget)
+
+    completed, pending = {}, []
+    for category, future in tasks.items():
+        if future not in done:
+            pending.append(category)
+            continue
+        try:
+            completed[category] = future.result()
+        except Exception as e:
+            logger.error(f"❌ Budget scraping error for {category}: {e}")
+            completed[category] = {"error": str(e)}
+    return completed, pending
+
+def _retry_hint(pending_count):
+    """Secondi stimati prima che le categorie in corso siano in cache"""
+    rounds = math.ceil(pending_count / scraping_server.work_queue.workers)
+    return max(1, math.ceil(scraping_server.work_queue.average_run_seconds(PRIORITY_BATCH) * rounds))
+
+def _budgeted_response(payload, pending):
+    """200 con le categorie pronte; se qualcuna è 'pending' anche l'header Retry-After"""
+    response = jsonify(payload)
+    if pending:
+        response.headers['Retry-After'] = str(payload["retry_after_seconds"])
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def _budget_payload(data, pending, budget, started):
+    """Payload comune della modalità budget, con i marcatori 'pending' nei dati"""
+    retry_after = _retry_hint(len(pending)) if pending else None
+    for category in pending:
+        data[category] = {"status": "pending", "retry_after_seconds": retry_after}
+    return {
+        "success": True,
+        "data": data,
+        "partial": bool(pending),
+        "pending": pending,
+        "retry_after_seconds": retry_after,
+        "budget_ms": int(budget * 1000),
+        "elapsed": round(time.time() - started, 3),
+    }
+
+def _scrape_categories_within_budget(categories, budget):
+    """Cache e categorie finite entro il budget; le altre continuano in background"""
+    started = time.time()
+    data, tasks = {}, {}
+    for category in categories:
+        cached_result = scraping_server.get_cached_result(category)
+        if cached_result:
+            data[category] = cached_result
+        else:
+            tasks[category] = _submit_budgeted(f"result:{category}", _scrape_category_in_background, category)
+
+    completed, pending = _collect_within_budget(tasks, budget)
+    data.update(completed)
+    if pending:
+        logger.info(f"⏳ Budget {budget:g}s: {len(pending)} categorie ancora in corso ({', '.join(pending)})")
+    payload = _budget_payload(data, pending, budget, started)
+    payload["data"] = {category: payload["data"][category] for category in categories}
+    return payload, pending
+
+def _scrape_category_in_background(category):
+    """Scraping di una categoria per la modalità budget: scade da solo come una richiesta normale"""
+    return scraping_server.scrape_category_safe(category, priority=PRIORITY_BATCH, deadline=Deadline(DEADLINE_DEFAULTS["scrape_category"]))
+
+# Streaming NDJSON / SSE per gli endpoint multi-categoria
+def _requested_stream_format():
+    """Ritorna 'ndjson', 'sse' o None in base a ?stream= o all'header Accept"""
+    stream = (request.args.get('stream') or '').lower()
+    if stream in ('ndjson', 'sse'):
+        return stream
+
+    accept = request.headers.get('Accept', '')
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    if 'text/event-stream' in accept:
+        return 'sse'
+    return None
+
+def _stream_response(records, stream_format):
+    """Serializza i record uno alla volta, chiudendo con un record di riepilogo"""
+    def generate():
+        count = 0
+        for record in records:
+            count += 1
+            yield _encode_stream_record(record, stream_format, "category")
+        yield _encode_stream_record({"done": True, "count": count}, stream_format, "end")
+
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Niente buffering sui proxy
+    return response
+
+def _encode_stream_record(record, stream_format, event):
+    payload = json_dumps(record).decode('utf-8')
+    if stream_format == 'sse':
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+def _iter_category_records(categories, deadline=None):
+    """
+    Prima le categorie già in cache, poi quelle da scaricare man mano che finiscono.
+    Alla scadenza lo stream si chiude senza avviare altri scraping
+    """
+    pending = []
+    for category in categories:
+        cached_result = scraping_server.get_cached_result(category)
+        if cached_result:
+            yield {"category": category, "cached": True, "data": cached_result}
+        else:
+            pending.append(category)
+
+    with results_store.sweep():
+        try:
+            for i, category in enumerate(pending):
+                if i > 0:
+                    # Piccola pausa tra categorie
+                    _pause(2, deadline)
+                if deadline is not None:
+                    deadline.check(f"scraping {category}")
+                result = scraping_server.scrape_category_safe(category, priority=PRIORITY_BATCH, deadline=deadline)
+                yield {"category": category, "cached": False, "data": result}
+        except DeadlineExceeded as e:
+            logger.warning(f"⏰ Stream categorie interrotto: {e}")
+
 @app.route('/cache/status', methods=['GET'])
 def cache_status():
-    """Endpoint per controllare lo stato della cache"""
-    cache_info = {}
+    """
+    Endpoint per controllare lo stato della cache. Niente ETag/Last-Modified:
+    le età cambiano a ogni richiesta e un 304 le lascerebbe ferme sul client
+    """
+    entries = []
     current_time = time.time()
 
-    for category, (data, timestamp) in scraping_cache.items():
+    for category, (data, timestamp) in list(scraping_cache.items()):
         age_seconds = current_time - timestamp
         # Determina la durata cache appropriata
         cache_duration = STANDINGS_CACHE_DURATION if category.startswith("standings_") else CACHE_DURATION
-        cache_info[category] = {
+        is_valid = age_seconds < cache_duration
+        entry_info = json_dumps({
             "age_seconds": round(age_seconds, 1),
-            "is_valid": age_seconds < cache_duration,
-            "cache_duration_used": cache_duration,
-            "data": data
-        }
+            "is_valid": is_valid,
+            "cache_duration_used": cache_duration
+        })
 
-    return jsonify({
+        digest = cache_validators.get(category, ('', timestamp))[0]
+
+        # I dati della voce sono codificati una volta per versione, qui si uniscono solo i bytes
+        if PRESERIALIZED_RESPONSES:
+            data_bytes = encoded_responses.get(f"entry:{category}", digest, lambda: json_dumps(data)).raw
+        else:
+            data_bytes = json_dumps(data)
+        entries.append(json_dumps(category) + b':' + entry_info[:-1] + b',"data":' + data_bytes + b'}')
+
+    header = json_dumps({
         "results_cache_duration": CACHE_DURATION,
-        "standings_cache_duration": STANDINGS_CACHE_DURATION,
-        "cache_info": cache_info
+        "standings_cache_duration": STANDINGS_CACHE_DURATION
+    })
+    body = header[:-1] + b',"cache_info":{' + b','.join(entries) + b'}}'
+    response = _json_response(EncodedBody(body))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    """
+    Change feed: solo le voci cambiate dopo la versione indicata
+    GET /changes?since=42&epoch=<epoch>&kind=standings&category=U17
+    """
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"success": False, "error": "Parameter 'since' must be an integer"}), 400
+
+    changes, reset, version = change_feed.since(
+        since,
+        epoch=request.args.get('epoch'),
+        kind=request.args.get('kind'),
+        category=request.args.get('category', '').upper() or None
+    )
+
+    return jsonify({
+        "success": True,
+        "epoch": change_feed.epoch,
+        "version": version,
+        "reset": reset,
+        "changes": changes
     })
 
 @app.route('/cache/clear', methods=['POST'])
@@ -279,6 +911,9 @@ def clear_cache():
     global scraping_cache
     old_count = len(scraping_cache)
     scraping_cache.clear()
+    cache_validators.clear()
+    encoded_responses.clear()
+    scraping_server.coordinator.clear_results()
 
     return jsonify({
         "success": True,
@@ -293,31 +928,59 @@ def scrape_standings(category):
 
     # Controlla cache
     current_time = time.time()
-    if cache_key in scraping_cache:
-        cached_data, cache_time = scraping_cache[cache_key]
-        if current_time - cache_time < STANDINGS_CACHE_DURATION:
-            logger.info(f"🏆 Returning cached standings for {category}")
-            return jsonify({
-                "success": True,
-                "category": category,
-                "standings": cached_data,
-                "cached": True,
-                "timestamp": cache_time
-            })
+    entry = _cache_fresh(cache_key, STANDINGS_CACHE_DURATION)
+    if entry:
+        cached_data, cache_time = entry
+        logger.info(f"🏆 Returning cached standings for {category}")
+        return _validated_json({
+            "success": True,
+            "category": category,
+            "standings": cached_data,
+            "cached": True,
+            "timestamp": cache_time
+        }, _cache_validators_for([cache_key], [cached_data]), encoded_key=f"{cache_key}:cached")
 
-    # Scraping classifica
+    # Scraping classifica tramite la coda a priorità, sotto lease tra le istanze
+    deadline = _request_deadline("standings")
+    try:
+        scraping_server.work_queue.admit(PRIORITY_INTERACTIVE, deadline)
+        (payload, status_code), shared = scraping_server.coordinator.run(
+            cache_key,
+            lambda: scraping_server.work_queue.run_until(deadline, PRIORITY_INTERACTIVE, _scrape_standings_uncached, category, cache_key, current_time, deadline),
+            STANDINGS_CACHE_DURATION,
+            share=lambda value: value[1] == 200,
+            deadline=deadline
+        )
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+    except Overloaded as e:
+        stale = _stale_cache(cache_key)
+        if not stale:
+            return _overloaded_response(e)
+        logger.info(f"🚦 Server saturo, classifica in cache scaduta per {category}")
+        return jsonify({"success": True, "category": category, "standings": stale[0], "cached": True, "stale": True, "timestamp": stale[1]})
+    if shared:
+        logger.info(f"🤝 Shared standings for {category} from another instance")
+        _cache_put(cache_key, payload["standings"], payload["timestamp"])
+        change_feed.record_standings(category, payload["standings"])
+    if status_code == 200:
+        return _validated_json(payload, _cache_validators_for([cache_key], [payload["standings"]]))
+    return jsonify(payload), status_code
+
+def _scrape_standings_uncached(category, cache_key, current_time, deadline=None):
+    """Scarica la classifica con un browser del pool, ritorna (payload, status_code)"""
     logger.info(f"🏆 Scraping standings for {category}")
-    scraper = scraping_server._get_scraper_from_pool()
+    scraper = scraping_server._get_scraper_from_pool(deadline)
 
     if not scraper:
-        return jsonify({
+        return {
             "success": False,
             "error": "No scraper available",
             "category": category
-        }), 500
+        }, 500
 
     try:
-        standings = scraper.scrape_category_standings(category)
+        standings = scraper.scrape_category_standings(category, deadline=deadline)
 
         if standings:
             # Converte format per Flutter app se necessario
@@ -342,129 +1005,317 @@ def scrape_standings(category):
                 standings = standings_map
 
             # Cache risultato
-            scraping_cache[cache_key] = (standings, current_time)
+            _cache_put(cache_key, standings, current_time)
+            change_feed.record_standings(category, standings)
             logger.info(f"✅ Standings scraped successfully for {category}: {len(standings) if isinstance(standings, dict) else len(standings)} teams")
 
-            return jsonify({
+            return {
                 "success": True,
                 "category": category,
                 "standings": standings,
                 "cached": False,
                 "timestamp": current_time
-            })
+            }, 200
         else:
             # Cache errore temporaneo (durata più breve)
-            scraping_cache[cache_key] = ({}, current_time - STANDINGS_CACHE_DURATION + FAST_CACHE_DURATION)
+            _cache_put(cache_key, {}, current_time - STANDINGS_CACHE_DURATION + FAST_CACHE_DURATION)
             logger.warning(f"⚠️ No standings found for {category}")
 
-            return jsonify({
+            return {
                 "success": False,
                 "error": "No standings found",
                 "category": category
-            }), 404
+            }, 404
 
+    except (DeadlineExceeded, Overloaded):
+        raise
     except Exception as e:
         logger.error(f"❌ Error scraping standings for {category}: {e}")
-        return jsonify({
+        return {
             "success": False,
             "error": str(e),
             "category": category
-        }), 500
+        }, 500
 
     finally:
         scraping_server._return_scraper_to_pool(scraper)
 
 @app.route('/update-standings/<category>', methods=['POST'])
 def update_standings_for_matches(category):
-    """Endpoint per aggiornare le posizioni in classifica per tutte le partite di una categoria"""
+    """
+    Endpoint per aggiornare le posizioni in classifica per tutte le partite di una categoria
+    POST /update-standings/all aggiorna tutte le categorie con una lettura e una scrittura
+    """
     category = category.upper()
-
-    # Prima scarica la classifica
-    logger.info(f"🏆 Downloading standings for {category}")
-    scraper = scraping_server._get_scraper_from_pool()
-
-    if not scraper:
+    if category != 'ALL' and category not in SUPPORTED_CATEGORIES:
         return jsonify({
             "success": False,
-            "error": "No scraper available"
-        }), 500
+            "error": f"Category {category} not supported. Supported: {SUPPORTED_CATEGORIES}"
+        }), 400
 
+    categories = SUPPORTED_CATEGORIES if category == 'ALL' else [category]
+    deadline = _request_deadline("update_standings")
     try:
-        standings = scraper.scrape_category_standings(category)
+        scraping_server.work_queue.admit(PRIORITY_BATCH, deadline)
+        payload, status_code = scraping_server.work_queue.run_until(deadline, PRIORITY_BATCH, _update_standings, categories, deadline)
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+    except Overloaded as e:
+        return _overloaded_response(e)
+    return jsonify(payload), status_code
+
+def _update_standings_for_category(category):
+    """Scarica la classifica e aggiorna le posizioni su Supabase, ritorna (payload, status_code)"""
+    return _update_standings([category])
+
+# Colonne lette da 'matches': identità della partita più le posizioni attuali.
+# La scrittura tocca solo home_position/away_position delle righe esistenti
+MATCH_POSITION_COLUMNS = 'id, aurora_team, opponent, is_home, home_position, away_position'
+
+def _update_standings(categories, deadline=None):
+    """
+    Aggiorna le posizioni in classifica per una o più categorie con una sola
+    lettura filtrata per aurora_team e una sola chiamata alla funzione
+    update_match_positions, ritorna (payload, status_code).
+    Alla scadenza (deadline) rinuncia prima di scrivere: DeadlineExceeded
+    """
+    timings = {}
+    started = time.time()
 
-        if not standings:
-            return jsonify({
-                "success": False,
-                "error": "Could not retrieve standings"
-            }), 404
+    # Prima scarica le classifiche
+    standings_by_category = {}
+    for category in categories:
+        logger.info(f"🏆 Downloading standings for {category}")
+        try:
+            standings = _scrape_standings_for_update(category, deadline)
+        except (DeadlineExceeded, Overloaded):
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error downloading standings for {category}: {e}")
+            standings = None
+        if standings:
+            standings_by_category[category] = standings
+    timings["scrape_ms"] = round((time.time() - started) * 1000, 1)
 
-        # Ora aggiorna le posizioni nel database Supabase
-        from supabase import create_client
+    if not standings_by_category:
+        return {
+            "success": False,
+            "error": "Could not retrieve standings"
+        }, 404
+
+    # Più categorie possono condividere lo stesso aurora_team (es. ALLIEVI)
+    standings_by_team = {}
+    for category, standings in standings_by_category.items():
+        aurora_team = TuttocampoSeleniumScraper.CATEGORY_TO_AURORA_TEAM.get(category, category)
+        standings_by_team.setdefault(aurora_team, []).append((category, standings))
 
-        SUPABASE_URL = 'https://hkhuabfxjlcidlodbiru.supabase.co'
-        SUPABASE_KEY = ('eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.'
-                       'eyJpc3MiOiJzdXBhYmFzZSIsInJlZiI6ImhraHVhYmZ4amxjaWRsb2RiaXJ1Iiwicm9sZSI6ImFub24iLCJpYXQiOjE3NTYwNTM2MjAsImV4cCI6MjA3MTYyOTYyMH0.'
-                       'ywg26EFefan4H1sPySmrWS0ndh6gPjOyjfqCIUQ67Ws')
+    try:
+        # Ora aggiorna le posizioni nel database Supabase
+        supabase = get_supabase_client()
+
+        # Una sola lettura, filtrata lato server e con le sole colonne necessarie
+        step = time.time()
+        with span("supabase.matches_positions_select"), SUPABASE_QUERY_SECONDS.time(query="matches_positions_select"):
+            matches = supabase.table('matches').select(MATCH_POSITION_COLUMNS).in_('aurora_team', list(standings_by_team)).execute().data
+        timings["read_ms"] = round((time.time() - step) * 1000, 1)
+
+        step = time.time()
+        rows, updated_by_category = _compute_position_updates(matches, standings_by_team)
+        timings["compute_ms"] = round((time.time() - step) * 1000, 1)
+
+        step = time.time()
+        statements = _write_match_positions(supabase, rows) if rows else 0
+        timings["write_ms"] = round((time.time() - step) * 1000, 1)
+        timings["write_statements"] = statements
+
+    except Exception as db_error:
+        logger.error(f"Database update error: {db_error}")
+        return {
+            "success": False,
+            "error": f"Database update failed: {str(db_error)}"
+        }, 500
 
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    timings["total_ms"] = round((time.time() - started) * 1000, 1)
+    logger.info(f"✅ Standings propagated: {len(rows)} matches updated out of {len(matches)} read ({timings})")
 
-        updated_matches = 0
+    payload = {
+        "success": True,
+        "matches_read": len(matches),
+        "matches_updated": len(rows),
+        "message": f"Updated {len(rows)} matches with standings data",
+        "timings": timings
+    }
+    if len(categories) == 1:
+        category = categories[0]
+        payload["category"] = category
+        payload["standings_found"] = len(standings_by_category[category])
+    else:
+        payload["categories"] = {
+            category: {
+                "standings_found": len(standings_by_category.get(category, {})),
+                "matches_updated": updated_by_category.get(category, 0)
+            }
+            for category in categories
+        }
+    return payload, 200
 
-        # Aggiorna le partite nella tabella matches
+def _write_match_positions(supabase, rows):
+    """
+    Scrive le posizioni con una sola chiamata RPC (UPDATE ... FROM jsonb_to_recordset).
+    Mai un upsert: diventerebbe INSERT ... ON CONFLICT (permesso di INSERT, colonne
+    NOT NULL). Se la funzione non è ancora installata ripiega su una UPDATE
+    ... WHERE id IN (...) per coppia di posizioni. Ritorna le istruzioni inviate
+    """
+    with span("supabase.matches_positions_update", rows=len(rows)), SUPABASE_QUERY_SECONDS.time(query="matches_positions_update"):
         try:
-            matches_response = supabase.table('matches').select('*').execute()
-
-            for match in matches_response.data:
-                # Usa i nomi corretti dei campi nella tabella matches
-                home_team = match.get('aurora_team', '').lower() if match.get('is_home', True) else match.get('opponent', '').lower()
-                away_team = match.get('opponent', '').lower() if match.get('is_home', True) else match.get('aurora_team', '').lower()
-
-                home_position = None
-                away_position = None
-
-                # Cerca le posizioni nelle standings
-                for team_key, team_data in standings.items():
-                    if team_key in home_team or any(word in team_key for word in home_team.split()):
-                        home_position = team_data['position']
-                    if team_key in away_team or any(word in team_key for word in away_team.split()):
-                        away_position = team_data['position']
-
-                # Aggiorna solo se abbiamo trovato almeno una posizione
-                if home_position or away_position:
-                    update_data = {}
-                    if home_position:
-                        update_data['home_position'] = home_position
-                    if away_position:
-                        update_data['away_position'] = away_position
-
-                    supabase.table('matches').update(update_data).eq('id', match['id']).execute()
-                    updated_matches += 1
-                    logger.info(f"Updated match {match['id']}: {home_team} ({home_position}) vs {away_team} ({away_position})")
-
-        except Exception as db_error:
-            logger.error(f"Database update error: {db_error}")
-            return jsonify({
-                "success": False,
-                "error": f"Database update failed: {str(db_error)}"
-            }), 500
+            supabase.rpc('update_match_positions', {'updates': rows}).execute()
+            return 1
+        except Exception as e:
+            logger.warning(f"⚠️ RPC update_match_positions non disponibile ({e}), UPDATE per coppia di posizioni")
+
+        updates = {}
+        for row in rows:
+            updates.setdefault((row['home_position'], row['away_position']), []).append(row['id'])
+        for (home_position, away_position), ids in updates.items():
+            supabase.table('matches').update({'home_position': home_position, 'away_position': away_position}).in_('id', ids).execute()
+        return len(updates)
+
+def _scrape_standings_for_update(category, deadline=None):
+    """Scarica una classifica con un browser del pool"""
+    scraper = scraping_server._get_scraper_from_pool(deadline)
+    try:
+        return scraper.scrape_category_standings(category, deadline=deadline)
+    finally:
+        scraping_server._return_scraper_to_pool(scraper)
 
-        return jsonify({
-            "success": True,
-            "category": category,
-            "standings_found": len(standings),
-            "matches_updated": updated_matches,
-            "message": f"Updated {updated_matches} matches with standings data"
+def _compute_position_updates(matches, standings_by_team):
+    """
+    Calcola in memoria le righe da aggiornare: solo le partite le cui posizioni
+    cambiano davvero. Ritorna (righe id/posizioni, partite aggiornate per categoria)
+    """
+    rows = []
+    updated_by_category = {}
+
+    for match in matches:
+        opponent = match.get('opponent') or ''
+        is_home = match.get('is_home', True)
+
+        # Prima categoria candidata (es. ALLIEVI U18/U17/U16) che contiene l'avversario
+        for category, standings in standings_by_team.get(match.get('aurora_team'), []):
+            team_index = team_index_for(standings)
+            opponent_position = team_index.position(opponent) if opponent else None
+            if opponent_position:
+                aurora_position = team_index.aurora_position()
+                break
+        else:
+            continue
+
+        home_position = aurora_position if is_home else opponent_position
+        away_position = opponent_position if is_home else aurora_position
+
+        # Aggiorna solo le posizioni trovate e diverse da quelle già salvate
+        update_data = {}
+        if home_position and home_position != match.get('home_position'):
+            update_data['home_position'] = home_position
+        if away_position and away_position != match.get('away_position'):
+            update_data['away_position'] = away_position
+        if not update_data:
+            continue
+
+        rows.append({
+            'id': match['id'],
+            'home_position': update_data.get('home_position', match.get('home_position')),
+            'away_position': update_data.get('away_position', match.get('away_position')),
         })
+        updated_by_category[category] = updated_by_category.get(category, 0) + 1
 
-    except Exception as e:
-        logger.error(f"❌ Error updating standings for {category}: {e}")
+    return rows, updated_by_category
+
+# Runner dei job asincroni
+def _run_scrape_all_job(job, params):
+    """Job 'scrape_all': scraping di tutte (o alcune) categorie"""
+    categories = params.get("categories") or SUPPORTED_CATEGORIES
+    return _scrape_categories(categories, job=job, priority=PRIORITY_BACKGROUND)
+
+def _run_update_standings_job(job, params):
+    """Job 'update_standings': aggiorna le posizioni per una o più categorie"""
+    categories = params.get("categories") or [params["category"]]
+    for category in categories:
+        job.update_progress(category, "pending")
+
+    results = {}
+    for category in categories:
+        job.update_progress(category, "running")
+        payload, status_code = scraping_server.work_queue.run(PRIORITY_BACKGROUND, _update_standings_for_category, category)
+        results[category] = payload
+        job.update_progress(category, "done" if status_code == 200 else "error", error=payload.get("error"))
+
+    return results
+
+job_manager.register("scrape_all", _run_scrape_all_job)
+job_manager.register("update_standings", _run_update_standings_job)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Accoda un job asincrono e ritorna subito il suo id
+    POST /jobs {"type": "scrape_all", "params": {"categories": ["U17", "U19"]}}
+    POST /jobs {"type": "update_standings", "params": {"category": "PROMOZIONE"}}
+    """
+    body = request.get_json(silent=True) or {}
+    job_type = body.get("type")
+    params = body.get("params") or {}
+
+    # Valida le categorie richieste
+    categories = params.get("categories") or ([params["category"]] if params.get("category") else [])
+    categories = [str(category).upper() for category in categories]
+    unsupported = [category for category in categories if category not in SUPPORTED_CATEGORIES]
+    if unsupported:
         return jsonify({
             "success": False,
-            "error": str(e)
-        }), 500
+            "error": f"Categories {unsupported} not supported. Supported: {SUPPORTED_CATEGORIES}"
+        }), 400
+    if job_type == "update_standings" and not categories:
+        return jsonify({
+            "success": False,
+            "error": "Job 'update_standings' requires 'category' or 'categories'"
+        }), 400
+    if categories:
+        params = {"categories": categories}
 
-    finally:
-        scraping_server._return_scraper_to_pool(scraper)
+    try:
+        job = job_manager.submit(job_type, params)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except JobRejected as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Elenco dei job ancora in memoria (senza risultati)"""
+    return jsonify({
+        "success": True,
+        "jobs": [job.to_dict(include_result=False) for job in job_manager.list()]
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Stato, avanzamento per categoria e risultato di un job"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({
+            "success": False,
+            "error": f"Job {job_id} not found or expired"
+        }), 404
+
+    return jsonify({"success": True, **job.to_dict()})
 
 @app.route('/scrape/aurora-results', methods=['GET'])
 def scrape_aurora_results():
@@ -472,6 +1323,7 @@ def scrape_aurora_results():
     Endpoint per scaricare TUTTI i risultati di Aurora Seriate del giorno
     Cerca "AURORA SERIATE" invece delle categorie specifiche
     Supporta parametro opzionale ?date=YYYY-MM-DD
+    e ?budget_ms= (categorie pronte entro il budget, le altre 'pending')
     """
     try:
         # Ottieni la data dall'URL parameter se specificata
@@ -489,80 +1341,596 @@ def scrape_aurora_results():
         # Usa la cache per i risultati Aurora con chiave data-specifica
         cache_key = f"aurora_all_results_{target_date or 'today'}"
         current_time = time.time()
+        deadline = _request_deadline("aurora_results")
 
-        # Controlla cache
-        if cache_key in scraping_cache:
-            cached_data, cache_time = scraping_cache[cache_key]
-            if current_time - cache_time < CACHE_DURATION:
-                logger.info(f"🎯 Returning cached Aurora results")
-                return jsonify({
-                    "success": True,
-                    "data": cached_data,
-                    "cached": True,
-                    "timestamp": cache_time
-                })
+        stream_format = _requested_stream_format()
+        if stream_format:
+            return _stream_response(_iter_aurora_records(target_date, cache_key, deadline), stream_format)
 
-        # Esegui scraping per Aurora Seriate
-        scraper = scraping_server._get_scraper_from_pool()
-
-        if not scraper:
+        # Date passate: risposta dall'archivio locale, lo scraping vale solo per oggi
+        archived = _archived_aurora_results(target_date, cache_key)
+        if archived is not None:
+            logger.info(f"🗄️ Returning archived Aurora results for {target_date}")
+            return _validated_json({
+                "success": True,
+                "data": archived,
+                "cached": True,
+                "archived": True,
+                "timestamp": scraping_cache[cache_key][1]
+            }, _cache_validators_for([cache_key], [archived]), encoded_key=f"{cache_key}:archived")
+        if is_past_day(target_date):
+            # La pagina live mostra solo la giornata corrente: mai spacciarla per una data passata
+            logger.info(f"🗄️ No archived Aurora results for {target_date}")
             return jsonify({
                 "success": False,
-                "error": "No scraper available"
-            }), 500
+                "error": f"No archived Aurora results for {target_date}",
+                "archived": False
+            }), 404
 
-        try:
-            # Se non è già avviato, avvialo
-            if not scraper.driver:
-                if not scraper.start():
-                    logger.warning("🚨 Chrome fallito su /aurora-results, attivazione modalità fallback")
-                    fallback_data = _get_aurora_fallback_data()
-                    return jsonify({
-                        "success": True,
-                        "data": fallback_data,
-                        "cached": False,
-                        "timestamp": time.time(),
-                        "mode": "fallback_emergency"
-                    })
-
-            # Prova prima lo scraping HTTP diretto, poi fallback a Selenium
-            try:
-                results = scraper.scrape_all_aurora_results_http_direct(target_date=target_date)
-                if not results:
-                    # Fallback a Selenium se HTTP diretto non funziona
-                    results = scraper.scrape_all_aurora_results(target_date=target_date)
-            except Exception as e:
-                logger.warning(f"HTTP direct scraping failed: {e}, trying Selenium")
-                results = scraper.scrape_all_aurora_results(target_date=target_date)
+        budget = _requested_budget()
+        if budget is not None and not _is_fresh(cache_key, CACHE_DURATION):
+            return _budgeted_response(*_aurora_results_within_budget(target_date, cache_key, budget))
+
+        # Controlla cache
+        entry = _cache_fresh(cache_key, CACHE_DURATION)
+        if entry:
+            cached_data, cache_time = entry
+            logger.info("🎯 Returning cached Aurora results")
+            return _validated_json({
+                "success": True,
+                "data": cached_data,
+                "cached": True,
+                "timestamp": cache_time
+            }, _cache_validators_for([cache_key], [cached_data]), encoded_key=f"{cache_key}:cached")
+
+        # Esegui scraping per Aurora Seriate tramite la coda a priorità, sotto lease tra le istanze
+        scraping_server.work_queue.admit(PRIORITY_INTERACTIVE, deadline)
+        (payload, status_code), shared = scraping_server.coordinator.run(
+            cache_key,
+            lambda: scraping_server.work_queue.run_until(deadline, PRIORITY_INTERACTIVE, _scrape_aurora_results_uncached, target_date, cache_key, current_time, deadline),
+            CACHE_DURATION,
+            share=lambda value: value[1] == 200 and not value[0].get("mode"),
+            deadline=deadline
+        )
+        if shared:
+            logger.info("🤝 Shared Aurora results from another instance")
+            _cache_put(cache_key, payload["data"], payload["timestamp"])
+            change_feed.record_aurora_results(target_date or 'today', payload["data"])
+        if status_code == 200:
+            return _validated_json(payload, _cache_validators_for([cache_key], [payload["data"]]))
+        return jsonify(payload), status_code
+
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+    except Overloaded as e:
+        stale = _stale_cache(cache_key)
+        if not stale:
+            return _overloaded_response(e)
+        logger.info("🚦 Server saturo, risultati Aurora in cache scaduti")
+        return jsonify({"success": True, "data": stale[0], "cached": True, "stale": True, "timestamp": stale[1]})
+    except Exception as e:
+        logger.error(f"❌ Error scraping Aurora results: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def _is_fresh(cache_key, duration):
+    return _cache_fresh(cache_key, duration) is not None
+
+def _aurora_results_within_budget(target_date, cache_key, budget):
+    """
+    Risultati Aurora per categoria entro il budget: le categorie in cache subito,
+    le altre scaricate in parallelo; quelle non finite restano 'pending' e
+    completano la cache in background
+    """
+    started = time.time()
+    date_key = target_date or 'today'
+    data, tasks = {}, {}
+    for category in SUPPORTED_CATEGORIES:
+        category_key = f"aurora_results_{date_key}_{category}"
+        if _is_fresh(category_key, CACHE_DURATION):
+            data[category] = scraping_cache[category_key][0]
+        else:
+            tasks[category] = _submit_budgeted(f"aurora:{date_key}:{category}", _scrape_aurora_category_in_background, target_date, cache_key, category)
 
-            if results:
-                # Salva in cache
-                scraping_cache[cache_key] = (results, current_time)
+    completed, pending = _collect_within_budget(tasks, budget)
+    data.update(completed)
+    payload = _budget_payload(data, pending, budget, started)
+    # Lista piatta come la risposta normale, più il dettaglio per categoria
+    payload["categories"] = {category: payload["data"][category] for category in SUPPORTED_CATEGORIES}
+    payload["data"] = [result for category in SUPPORTED_CATEGORIES if isinstance(data.get(category), list) for result in data[category]]
+    return payload, pending
 
-                logger.info(f"✅ Found {len(results)} Aurora results for the day")
+def _scrape_aurora_category_in_background(target_date, cache_key, category):
+    """
+    Una categoria dei risultati Aurora (HTTP diretto, Selenium solo se il browser
+    è già avviato), salvata nella cache per categoria. Quando tutte le categorie
+    sono in cache compone anche la voce completa del giorno
+    """
+    date_key = target_date or 'today'
+    deadline = Deadline(DEADLINE_DEFAULTS["aurora_results"])
+    category_results = scraping_server.work_queue.run_until(deadline, PRIORITY_BATCH, _scrape_aurora_category_http, target_date, category, deadline)
+    if not category_results:
+        category_results = scraping_server.work_queue.run_until(deadline, PRIORITY_BATCH, _scrape_aurora_category_selenium, target_date, category, deadline, False) or []
+
+    _cache_put(f"aurora_results_{date_key}_{category}", category_results)
+    if category_results:
+        results_store.add(category_results, target_date)
+        _archive_live_results(category_results, target_date)
+
+    category_keys = [f"aurora_results_{date_key}_{other}" for other in SUPPORTED_CATEGORIES]
+    if all(_is_fresh(key, CACHE_DURATION) for key in category_keys):
+        all_results = [result for key in category_keys for result in scraping_cache[key][0]]
+        if all_results:
+            _cache_put(cache_key, all_results)
+            change_feed.record_aurora_results(date_key, all_results)
+    return category_results
+
+def _archived_aurora_results(target_date, cache_key):
+    """Risultati di una data passata dall'archivio locale (passando dalla cache), None se mai archiviata"""
+    if not is_past_day(target_date):
+        return None
+
+    entry = _cache_fresh(cache_key, CACHE_DURATION)
+    if entry:
+        return entry[0]
+
+    archived = results_archive.get_day(target_date)
+    if archived is None:
+        return None
+    _cache_put(cache_key, archived[0])
+    return archived[0]
+
+def _archive_live_results(results, target_date):
+    """Archivia uno scraping live: solo per oggi e solo dati veri (niente fallback)"""
+    day = live_day(target_date)
+    if day:
+        results_archive.append([result for result in results if is_persistable(result)], day)
+
+def _scrape_aurora_results_uncached(target_date, cache_key, current_time, deadline=None):
+    """Scraping dei risultati Aurora del giorno (HTTP diretto, poi Selenium), ritorna (payload, status_code)"""
+    # Prima lo scraping HTTP diretto, che non occupa una sessione browser
+    results = []
+    try:
+        results = _http_scraper().scrape_all_aurora_results_http_direct(target_date=target_date, deadline=deadline)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.warning(f"HTTP direct scraping failed: {e}, trying Selenium")
 
-                return jsonify({
+    if not results:
+        # Fallback a Selenium: la sessione si prende qui, già dentro il lavoro della coda
+        scraper = scraping_server._get_scraper_from_pool(deadline)
+        try:
+            if not scraper.driver and not scraper.start():
+                logger.warning("🚨 Chrome fallito su /aurora-results, attivazione modalità fallback")
+                return {
                     "success": True,
-                    "data": results,
+                    "data": _get_aurora_fallback_data(),
                     "cached": False,
-                    "timestamp": current_time
-                })
-            else:
-                logger.warning("❌ No Aurora results found for today")
-                return jsonify({
-                    "success": False,
-                    "error": "No Aurora results found for today"
-                }), 404
-
+                    "timestamp": time.time(),
+                    "mode": "fallback_emergency"
+                }, 200
+            results = scraper.scrape_all_aurora_results(target_date=target_date, deadline=deadline)
         finally:
             scraping_server._return_scraper_to_pool(scraper)
 
-    except Exception as e:
-        logger.error(f"❌ Error scraping Aurora results: {e}")
-        return jsonify({
+    if results:
+        # Salva in cache e scrivi su Supabase con un solo upsert
+        _cache_put(cache_key, results, current_time)
+        change_feed.record_aurora_results(target_date or 'today', results)
+        results_store.add(results, target_date)
+        results_store.flush()
+        _archive_live_results(results, target_date)
+
+        logger.info(f"✅ Found {len(results)} Aurora results for the day")
+
+        return {
+            "success": True,
+            "data": results,
+            "cached": False,
+            "timestamp": current_time
+        }, 200
+    else:
+        logger.warning("❌ No Aurora results found for today")
+        return {
             "success": False,
-            "error": str(e)
-        }), 500
+            "error": "No Aurora results found for today"
+        }, 404
+
+def _iter_aurora_records(target_date, cache_key, deadline=None):
+    """
+    Record per categoria dei risultati Aurora: prima la cache (completa o per
+    categoria), poi lo scraping live HTTP diretto con fallback a Selenium.
+    Alla scadenza lo stream si chiude con le categorie già pronte
+    """
+    date_key = target_date or 'today'
+
+    # Date passate: tutti i record dall'archivio locale
+    archived = _archived_aurora_results(target_date, cache_key)
+    if archived is not None:
+        for category in SUPPORTED_CATEGORIES:
+            yield {"category": category, "cached": True, "archived": True, "data": [r for r in archived if r.get('category') == category]}
+        return
+    if is_past_day(target_date):
+        yield {"category": None, "cached": False, "archived": False, "data": [], "error": f"No archived Aurora results for {target_date}"}
+        return
+
+    # Cache completa: tutti i record subito
+    entry = _cache_fresh(cache_key, CACHE_DURATION)
+    if entry:
+        for category in SUPPORTED_CATEGORIES:
+            category_results = [r for r in entry[0] if r.get('category') == category]
+            yield {"category": category, "cached": True, "data": category_results}
+        return
+
+    all_results = []
+    pending = []
+    for category in SUPPORTED_CATEGORIES:
+        category_key = f"aurora_results_{date_key}_{category}"
+        entry = _cache_fresh(category_key, CACHE_DURATION)
+        if entry:
+            all_results.extend(entry[0])
+            yield {"category": category, "cached": True, "data": entry[0]}
+            continue
+        pending.append(category)
+
+    if not pending:
+        return
+
+    # Ogni categoria è un lavoro della coda: la sessione browser (solo per il
+    # fallback Selenium) si prende dentro il lavoro, mai mentre si attende la coda
+    live_records = []
+    try:
+        scraping_server.work_queue.admit(PRIORITY_BATCH, deadline)
+        try:
+            for category in pending:
+                category_results = scraping_server.work_queue.run_until(deadline, PRIORITY_BATCH, _scrape_aurora_category_http, target_date, category, deadline)
+                live_records.append((category, category_results))
+                if category_results:
+                    yield {"category": category, "cached": False, "data": category_results, "method": "http_direct"}
+        except (DeadlineExceeded, Overloaded):
+            raise
+        except Exception as e:
+            logger.warning(f"HTTP direct streaming failed: {e}, trying Selenium")
+            live_records = []
+
+        found = any(category_results for _, category_results in live_records)
+        if found:
+            # Le categorie senza partite Aurora chiudono lo stream come vuote
+            for category, category_results in live_records:
+                if not category_results:
+                    yield {"category": category, "cached": False, "data": [], "method": "http_direct"}
+        else:
+            # Fallback a Selenium se HTTP diretto non trova nulla
+            live_records = []
+            for category in pending:
+                category_results = scraping_server.work_queue.run_until(deadline, PRIORITY_BATCH, _scrape_aurora_category_selenium, target_date, category, deadline)
+                if category_results is None:
+                    logger.warning("🚨 Chrome fallito su /aurora-results stream, attivazione modalità fallback")
+                    yield {"category": None, "cached": False, "data": _get_aurora_fallback_data(), "mode": "fallback_emergency"}
+                    return
+                live_records.append((category, category_results))
+                yield {"category": category, "cached": False, "data": category_results, "method": "selenium"}
+
+        now = time.time()
+        for category, category_results in live_records:
+            _cache_put(f"aurora_results_{date_key}_{category}", category_results, now)
+            all_results.extend(category_results)
+        if all_results:
+            _cache_put(cache_key, all_results, now)
+            change_feed.record_aurora_results(date_key, all_results)
+        live_results = [result for _, category_results in live_records for result in category_results]
+        if live_results:
+            results_store.add(live_results, target_date)
+            results_store.flush()
+            _archive_live_results(live_results, target_date)
+
+    except Overloaded as e:
+        yield {"category": None, "cached": False, "data": [], "error": str(e), "overloaded": True, "retry_after_seconds": e.retry_after}
+    except DeadlineExceeded as e:
+        logger.warning(f"⏰ Stream risultati Aurora interrotto: {e}")
+
+@app.route('/batch', methods=['POST'])
+def batch_resolve():
+    """
+    Risolve più risultati e classifiche in una sola chiamata
+    POST /batch {"items": [{"kind": "results", "category": "U17", "date": "2025-10-12"},
+                           {"kind": "standings", "category": "U17"}]}
+    Ogni pagina tuttocampo necessaria viene scaricata una sola volta via HTTP
+    e su di essa girano tutti gli estrattori richiesti
+    """
+    start_time = time.time()
+    body = request.get_json(silent=True) or {}
+    items = body.get("items")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"success": False, "error": "Body must contain a non-empty 'items' list"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"success": False, "error": f"Too many items ({len(items)} > {BATCH_MAX_ITEMS})"}), 400
+
+    normalized = []
+    for item in items:
+        kind = str(item.get("kind", "")).lower()
+        category = str(item.get("category", "")).upper()
+        if kind not in ("results", "standings") or category not in SUPPORTED_CATEGORIES:
+            return jsonify({
+                "success": False,
+                "error": f"Invalid item {item}: kind must be 'results' or 'standings', category one of {SUPPORTED_CATEGORIES}"
+            }), 400
+        normalized.append({"kind": kind, "category": category, "date": item.get("date") if kind == "results" else None})
+
+    if not SELENIUM_AVAILABLE:
+        return jsonify({"success": False, "error": "Scraper not available in this environment"}), 500
+
+    try:
+        responses, pages_fetched = _resolve_batch(normalized, _request_deadline("batch"))
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+
+    return jsonify({
+        "success": True,
+        "results": responses,
+        "pages_fetched": pages_fetched,
+        "elapsed": round(time.time() - start_time, 3)
+    })
+
+def _batch_cache_key(item):
+    if item["kind"] == "standings":
+        return f"standings_{item['category']}"
+    return f"aurora_results_{item['date'] or 'today'}_{item['category']}"
+
+def _resolve_batch(items, deadline=None):
+    """Serve dalla cache ciò che c'è, pianifica le pagine uniche mancanti e le scarica una volta"""
+    responses = [None] * len(items)
+    pages = {}  # url -> lista di indici delle voci che la usano
+
+    for index, item in enumerate(items):
+        # Risultati di date passate solo dall'archivio: la pagina live è la giornata corrente
+        if item["kind"] == "results" and is_past_day(item["date"]):
+            archived = results_archive.get_day(item["date"])
+            if archived is None:
+                responses[index] = {**item, "success": False, "error": f"No archived Aurora results for {item['date']}", "archived": False}
+            else:
+                responses[index] = {**item, "success": True, "data": [r for r in archived[0] if r.get('category') == item["category"]], "cached": True, "archived": True}
+            continue
+
+        cache_key = _batch_cache_key(item)
+        duration = STANDINGS_CACHE_DURATION if item["kind"] == "standings" else CACHE_DURATION
+        entry = _cache_fresh(cache_key, duration)
+        # Una classifica vuota è un errore in cache breve, non una risposta valida
+        if entry and (entry[0] or item["kind"] == "results"):
+            responses[index] = {**item, "success": True, "data": entry[0], "cached": True}
+            continue
+
+        page_urls = TuttocampoSeleniumScraper.STANDINGS_PAGE_URLS if item["kind"] == "standings" else TuttocampoSeleniumScraper.RESULTS_PAGE_URLS
+        pages.setdefault(page_urls[item["category"]], []).append(index)
+
+    if not pages:
+        return responses, 0
+
+    logger.info(f"📦 Batch: {len(items)} voci, {len(pages)} pagine uniche da scaricare")
+    try:
+        scraping_server.work_queue.admit(PRIORITY_BATCH, deadline)
+    except Overloaded as e:
+        # Sotto carico: le voci mancanti dalla cache scaduta, se c'è, altrimenti da riprovare
+        for indexes in pages.values():
+            for index in indexes:
+                stale = _stale_cache(_batch_cache_key(items[index]))
+                if stale:
+                    responses[index] = {**items[index], "success": True, "data": stale[0], "cached": True, "stale": True}
+                else:
+                    responses[index] = {**items[index], "success": False, "error": str(e), "overloaded": True, "retry_after_seconds": e.retry_after}
+        return responses, 0
+
+    # Pagine via HTTP dalla coda e parsing qui: nessuna sessione browser
+    parser = _http_scraper()
+    for url, indexes in pages.items():
+        try:
+            soup = scraping_server.work_queue.run_until(deadline, PRIORITY_BATCH, _fetch_page_http, url, deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"❌ Batch: errore scaricando {url}: {e}")
+            for index in indexes:
+                responses[index] = {**items[index], "success": False, "error": str(e), "source_url": url}
+            continue
+
+        extracted = {}  # Un'estrazione per combinazione (kind, category, date) sulla stessa pagina
+        for index in indexes:
+            item = items[index]
+            extraction_key = (item["kind"], item["category"], item["date"])
+            if extraction_key not in extracted:
+                if item["kind"] == "standings":
+                    data = parser._extract_standings_from_html(soup)
+                    # Il JSON-LD delle squadre ha posizioni alfabetiche e statistiche stimate:
+                    # mai in cache o nel change feed come classifica vera
+                    if data and not _is_placeholder_standings(data):
+                        _cache_put(_batch_cache_key(item), data)
+                        change_feed.record_standings(item["category"], data)
+                else:
+                    data = parser._extract_aurora_matches_from_html(soup, item["category"], item["date"])
+                    _cache_put(_batch_cache_key(item), data)
+                extracted[extraction_key] = data
+
+            data = extracted[extraction_key]
+            if item["kind"] == "standings" and not data:
+                responses[index] = {**item, "success": False, "error": "No standings found", "source_url": url}
+            elif item["kind"] == "standings" and _is_placeholder_standings(data):
+                responses[index] = {**item, "success": False, "error": "No standings table, only the team list", "degraded": True, "source_url": url}
+            else:
+                responses[index] = {**item, "success": True, "data": data, "cached": False, "source_url": url}
+
+    return responses, len(pages)
+
+def _is_placeholder_standings(standings):
+    """True per la lista squadre dal JSON-LD (ordine alfabetico), non una classifica"""
+    return any(isinstance(entry, dict) and entry.get('source') == 'jsonld' for entry in standings.values())
+
+def _scrape_aurora_category(iterate, target_date, category, deadline=None):
+    """Un solo passo dello sweep Aurora (una categoria), eseguito da un worker della coda"""
+    for _, category_results in iterate(target_date=target_date, categories=[category], deadline=deadline):
+        return category_results
+    return []
+
+# Scraper senza Chrome per le pagine via HTTP, uno per thread (sessione keep-alive propria)
+_http_scrapers = threading.local()
+
+def _http_scraper():
+    """Scraper per fetch_page_http e i parser: non occupa una sessione browser"""
+    scraper = getattr(_http_scrapers, "scraper", None)
+    if scraper is None:
+        scraper = _http_scrapers.scraper = TuttocampoSeleniumScraper(headless=True)
+    return scraper
+
+def _fetch_page_http(url, deadline=None):
+    """Una pagina tuttocampo via HTTP, eseguita da un worker della coda"""
+    return _http_scraper().fetch_page_http(url, deadline=deadline)
+
+def _scrape_aurora_category_http(target_date, category, deadline=None):
+    """Una categoria dello sweep Aurora via HTTP diretto, eseguita da un worker della coda"""
+    return _scrape_aurora_category(_http_scraper().iter_aurora_results_http_direct, target_date, category, deadline)
+
+def _scrape_aurora_category_selenium(target_date, category, deadline=None, start=True):
+    """
+    Una categoria dello sweep Aurora con Selenium, eseguita da un worker della coda.
+    La sessione browser si prende e si restituisce qui dentro, come negli scraping
+    interattivi: mai una sessione tenuta mentre si attende la coda.
+    None se Chrome non è avviato (start=False) o non parte
+    """
+    scraper = scraping_server._get_scraper_from_pool(deadline)
+    try:
+        if not scraper.driver and (not start or not scraper.start()):
+            return None
+        return _scrape_aurora_category(scraper.iter_all_aurora_results, target_date, category, deadline)
+    finally:
+        scraping_server._return_scraper_to_pool(scraper)
+
+@app.route('/queue/status', methods=['GET'])
+def queue_status():
+    """Profondità della coda, tempi di attesa per classe di priorità e latenza del database"""
+    return jsonify({
+        "success": True,
+        "queue": scraping_server.work_queue.status(),
+        "browsers": scraping_server.browser_status(),
+        "leases": scraping_server.coordinator.status(),
+        "database": database_status(),
+        "results_store": results_store.status(),
+        "results_archive": results_archive.status(),
+        "encoded_responses": encoded_responses.status()
+    })
+
+@app.route('/browsers/memory', methods=['GET'])
+def browsers_memory():
+    """Memoria (RSS da /proc) di ogni browser e del container, con soglie di riciclo"""
+    return jsonify({"success": True, **scraping_server.browser_status(), **scraping_server.browser_memory_status()})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metriche in formato Prometheus, sommate su tutti i worker del server"""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/debug/traces', methods=['GET'])
+def debug_traces():
+    """Tracce recenti di questo worker (prima le ultime); ?min_ms= per le sole richieste lente"""
+    limit = request.args.get('limit', default=50, type=int)
+    min_ms = request.args.get('min_ms', default=0.0, type=float)
+    return jsonify({
+        "success": True,
+        "exporter": trace_exporter.status(),
+        "traces": trace_exporter.recent_traces(limit, min_ms)
+    })
+
+@app.route('/debug/traces/<trace_id>', methods=['GET'])
+def debug_trace(trace_id):
+    """Span di una traccia (offset e durata in ms); 404 se non è più nel buffer o è di un altro worker"""
+    trace = trace_exporter.get(trace_id.lower())
+    if trace is None:
+        return jsonify({"success": False, "error": f"Trace {trace_id} not found in this worker"}), 404
+    return jsonify({"success": True, "trace": trace.to_dict()})
+
+@app.route('/debug/profile', methods=['POST'])
+def debug_profile():
+    """
+    Profiling su richiesta (header X-Admin-Token)
+    POST /debug/profile?category=U19&kind=results|standings&mode=cprofile|sampling&format=pstats|prof
+    POST /debug/profile?seconds=10 - campionamento di tutti i thread del worker per N secondi
+    Lo scraping profilato è vero (salta la cache e la aggiorna) e passa dalla coda come gli altri
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    mode = request.args.get('mode', default=MODE_CPROFILE).lower()
+    output = request.args.get('format', default='pstats').lower()
+    seconds = request.args.get('seconds', type=float)
+    category = (request.args.get('category') or '').upper()
+    kind = request.args.get('kind', default='results').lower()
+    if mode not in (MODE_CPROFILE, MODE_SAMPLING) or output not in ('pstats', 'prof') or kind not in ('results', 'standings'):
+        return jsonify({"success": False, "error": "Use mode=cprofile|sampling, format=pstats|prof, kind=results|standings"}), 400
+
+    try:
+        if seconds:
+            logger.info(f"🔬 Profiling del worker per {seconds}s (campionamento)")
+            report = profiler.sample_process(seconds)
+            outcome = "process"
+        else:
+            if category not in SUPPORTED_CATEGORIES:
+                return jsonify({"success": False, "error": f"Category {category} not supported", "supported_categories": SUPPORTED_CATEGORIES}), 400
+            if not SELENIUM_AVAILABLE:
+                return jsonify({"success": False, "error": "Selenium not available"}), 503
+
+            logger.info(f"🔬 Profiling {kind} {category} ({mode})")
+            current_time = time.time()
+            if kind == 'standings':
+                deadline = _request_deadline("standings")
+                fn, args = _scrape_standings_uncached, (category, f"standings_{category}", current_time, deadline)
+            else:
+                deadline = _request_deadline("scrape_category")
+                fn, args = scraping_server._scrape_category_uncached, (category, current_time, deadline)
+            scraping_server.work_queue.admit(PRIORITY_INTERACTIVE, deadline)
+            result, report = scraping_server.work_queue.run_until(
+                deadline, PRIORITY_INTERACTIVE, profiler.profile_call, mode, output, fn, *args
+            )
+            if kind == 'standings':
+                outcome = str(result[1])
+            else:
+                outcome = "error" if not result or "error" in result else "ok"
+    except ProfilerBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+    except Overloaded as e:
+        return _overloaded_response(e)
+
+    response = Response(report.body, content_type=report.content_type)
+    response.headers['X-Profile-Mode'] = report.mode
+    response.headers['X-Profile-Seconds'] = f"{report.seconds:.3f}"
+    response.headers['X-Profile-Outcome'] = outcome
+    if report.samples is not None:
+        response.headers['X-Profile-Samples'] = str(report.samples)
+    if output == 'prof' and report.mode == MODE_CPROFILE:
+        response.headers['Content-Disposition'] = f'attachment; filename="{kind}_{category or "worker"}.prof"'
+    return response
+
+@app.route('/schedule', methods=['GET'])
+def schedule_status():
+    """Calendario delle giornate in memoria usato per gli URL dinamici"""
+    team_names = sorted(set(TuttocampoSeleniumScraper.CATEGORY_TO_AURORA_TEAM.values()))
+    return jsonify({
+        "success": True,
+        "schedule": giornata_schedule.status(team_names)
+    })
+
+@app.route('/schedule/refresh', methods=['POST'])
+def schedule_refresh():
+    """Ricarica subito il calendario (da chiamare dopo aver modificato le partite)"""
+    refreshed = giornata_schedule.refresh()
+    return jsonify({
+        "success": refreshed,
+        "schedule": giornata_schedule.status()
+    }), 200 if refreshed else 502
 
 # Funzioni helper per modalità fallback di emergenza
 def _get_fallback_data(category):
@@ -611,12 +1979,23 @@ if __name__ == '__main__':
     logger.info(f"🌐 Server will run on http://0.0.0.0:{port}")
     logger.info("📋 Available endpoints:")
     logger.info("   GET /health - Health check")
+    logger.info("   GET /ready - Warm-up state and startup timings")
     logger.info("   GET /scrape/<category> - Scrape specific category")
     logger.info("   GET /scrape/all - Scrape all categories")
     logger.info("   GET /scrape/aurora-results - Scrape ALL Aurora results for today")
     logger.info("   GET /test/http-direct - Test HTTP direct scraping")
     logger.info("   GET /cache/status - Check cache status")
     logger.info("   POST /cache/clear - Clear cache")
+    logger.info("   POST /jobs - Submit async job (scrape_all, update_standings)")
+    logger.info("   GET /jobs/<job_id> - Job progress and result")
+    logger.info("   GET /changes?since=<version> - Result and standings deltas")
+    logger.info("   POST /batch - Results and standings for many categories in one call")
+    logger.info("   GET /queue/status - Priority queue depth and wait times")
+    logger.info("   GET /browsers/memory - Per-browser RSS and recycling thresholds")
+    logger.info("   GET /metrics - Prometheus metrics aggregated across workers")
+    logger.info("   GET /debug/traces - Recent request traces (X-Trace-Id), /debug/traces/<trace_id> for spans")
+    logger.info("   POST /debug/profile - Profile one scrape or the whole worker (X-Admin-Token)")
+    logger.info("   GET /schedule - In-memory giornata schedule (POST /schedule/refresh to reload)")
 
 @app.route('/test/http-direct', methods=['GET'])
 def test_http_direct():
@@ -626,7 +2005,6 @@ def test_http_direct():
         logger.info(f"🧪 Testing HTTP direct scraping (date: {target_date or 'today'})")
 
         # Crea un'istanza del scraper per il test
-        from selenium_scraper import TuttocampoSeleniumScraper
         scraper = TuttocampoSeleniumScraper()
 
         # Testa il nuovo metodo HTTP diretto
@@ -658,7 +2036,6 @@ def debug_standings_http_only(category):
 
     try:
         # Crea scraper senza Chrome
-        from selenium_scraper import TuttocampoSeleniumScraper
         scraper = TuttocampoSeleniumScraper()
         # Non avviamo Chrome - forza HTTP-only
 
@@ -694,6 +2071,12 @@ def debug_standings_http_only(category):
             "debug": True
         }), 500
 
+# Fine dell'import: istantanee delle metriche per /metrics degli altri worker,
+# browser e client si preparano in background
+metrics_registry.start()
+if WARM_UP_ON_IMPORT:
+    warm_up.start()
+
 # Avvio del server
 if __name__ == '__main__':
     # Avvia il server Flask
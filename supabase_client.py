@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Client Supabase condiviso dal processo - Aurora Seriate 1967
+Un solo client creato al primo uso e usato sia dallo scraper sia dal server:
+connessioni HTTP riutilizzate da un pool httpx e tempi di ogni query misurati
+a parte rispetto ai tempi di scraping. Il pacchetto supabase (e httpx) viene
+importato solo alla creazione del client: l'import del server resta veloce
+"""
+
+import os
+import threading
+import time
+import logging
+import importlib.util
+from collections import deque
+
+SUPABASE_AVAILABLE = importlib.util.find_spec("supabase") is not None
+
+logger = logging.getLogger(__name__)
+
+# La chiave anon è la stessa pubblicata nell'app Flutter: in produzione va impostata da ambiente
+SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://hkhuabfxjlcidlodbiru.supabase.co")
+SUPABASE_KEY = os.environ.get(
+    "SUPABASE_KEY",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9."
+    "eyJpc3MiOiJzdXBhYmFzZSIsInJlZiI6ImhraHVhYmZ4amxjaWRsb2RiaXJ1Iiwicm9sZSI6ImFub24iLCJpYXQiOjE3NTYwNTM2MjAsImV4cCI6MjA3MTYyOTYyMH0."
+    "ywg26EFefan4H1sPySmrWS0ndh6gPjOyjfqCIUQ67Ws"
+)
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", 10))
+SUPABASE_MAX_CONNECTIONS = int(os.environ.get("SUPABASE_MAX_CONNECTIONS", 10))
+SUPABASE_KEEPALIVE_CONNECTIONS = int(os.environ.get("SUPABASE_KEEPALIVE_CONNECTIONS", 5))
+SUPABASE_SLOW_QUERY_MS = float(os.environ.get("SUPABASE_SLOW_QUERY_MS", 500))
+QUERY_SAMPLES = 200  # Query recenti conservate per il p95
+
+
+class QueryStats:
+    """Tempi delle query per tabella e metodo HTTP"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {}
+
+    def record(self, table, method, status_code, elapsed_ms):
+        with self.lock:
+            stats = self.tables.setdefault(f"{method} {table}", {
+                "count": 0,
+                "errors": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "recent_ms": deque(maxlen=QUERY_SAMPLES),
+            })
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["recent_ms"].append(elapsed_ms)
+            if status_code >= 400:
+                stats["errors"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            queries = {}
+            for name, stats in self.tables.items():
+                recent = sorted(stats["recent_ms"])
+                queries[name] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 1),
+                    "p95_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 1),
+                    "max_ms": round(stats["max_ms"], 1),
+                }
+            return queries
+
+
+query_stats = QueryStats()
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _on_request(request):
+    request.extensions["aurora_started_at"] = time.perf_counter()
+
+
+def _on_response(response):
+    started_at = response.request.extensions.get("aurora_started_at")
+    if started_at is None:
+        return
+
+    # Tempo fino agli header della risposta: la latenza del database, non del parsing
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    table = response.request.url.path.rstrip("/").rsplit("/", 1)[-1]
+    method = response.request.method
+    query_stats.record(table, method, response.status_code, elapsed_ms)
+
+    if elapsed_ms > SUPABASE_SLOW_QUERY_MS:
+        logger.warning(f"🐢 Query lenta {method} {table}: {elapsed_ms:.0f}ms")
+
+
+def _pooled_session(session):
+    """Sostituisce la sessione postgrest con una sessione httpx a pool limitato e con hook"""
+    import httpx
+    from postgrest.utils import SyncClient
+
+    return SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_KEEPALIVE_CONNECTIONS,
+        ),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+
+def get_supabase_client():
+    """Ritorna il client Supabase del processo, creandolo al primo uso"""
+    global _client
+
+    if _client is not None:
+        return _client
+
+    if not SUPABASE_AVAILABLE:
+        raise RuntimeError("Supabase client not available: install the 'supabase' package")
+
+    with _client_lock:
+        if _client is None:
+            from supabase import create_client
+
+            client = create_client(SUPABASE_URL, SUPABASE_KEY)
+            default_session = client.postgrest.session
+            client.postgrest.session = _pooled_session(default_session)
+            default_session.close()
+            _client = client
+            logger.info(f"✅ Client Supabase creato ({SUPABASE_URL}, max {SUPABASE_MAX_CONNECTIONS} connessioni)")
+    return _client
+
+
+def status():
+    """Stato del client e tempi delle query per /queue/status"""
+    return {
+        "available": SUPABASE_AVAILABLE,
+        "initialized": _client is not None,
+        "url": SUPABASE_URL,
+        "max_connections": SUPABASE_MAX_CONNECTIONS,
+        "slow_query_ms": SUPABASE_SLOW_QUERY_MS,
+        "queries": query_stats.snapshot(),
+    }
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Indice normalizzato dei nomi squadra - Aurora Seriate 1967
+I nomi arrivano in forme diverse (tuttocampo, JSON-LD, database): "A.S.D. Città
+di Albino", "citta_di_albino", "Albino". Ogni nome viene normalizzato (accenti,
+punteggiatura, sigle societarie, anni di fondazione) e ogni classifica viene
+indicizzata una sola volta: la ricerca è un accesso al dizionario, con un
+fallback a punteggio che rifiuta i casi ambigui invece di indovinare
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Parole che non distinguono una squadra dall'altra
+GENERIC_TOKENS = {
+    "asd", "ssd", "ssdrl", "ssdarl", "srl", "arl", "usd", "us", "as", "ac", "acd",
+    "gs", "gsd", "fc", "sc", "ss", "polisportiva", "pol", "calcio", "football",
+    "club", "sport", "sportiva", "associazione", "societa", "unione",
+}
+# Prefissi di più parole tolti solo all'inizio del nome
+GENERIC_PREFIXES = (("citta", "di"), ("comune", "di"))
+YEAR_PATTERN = re.compile(r"^(18|19|20)\d\d$")
+# Sigle di sole lettere puntate ("A.S.D.", "S.S.D.R.L", "U.S."): le uniche da unire
+ACRONYM_PATTERN = re.compile(r"\b(?:[a-z]\.){2,}(?:[a-z]\b)?")
+
+FALLBACK_MIN_SCORE = 0.5  # Il fallback richiede una quota di parole in comune oltre questa
+TEAM_INDEX_CACHE_SIZE = 32  # Classifiche indicizzate tenute in memoria
+
+
+def _fold(name):
+    """
+    Minuscolo senza accenti, sigle puntate unite ("A.S.D." -> "asd"), ogni altro
+    punto e il resto della punteggiatura come spazio ("OR.BOCCALEONE" -> "or boccaleone")
+    """
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    text = ACRONYM_PATTERN.sub(lambda match: match.group(0).replace(".", "") + " ", text)
+    return re.sub(r"[^a-z0-9]+", " ", text).split()
+
+
+def normalize_team_name(name):
+    """Forma canonica di un nome squadra come tupla di parole significative"""
+    tokens = _fold(name)
+    significant = [token for token in tokens if token not in GENERIC_TOKENS and not YEAR_PATTERN.match(token)]
+
+    for prefix in GENERIC_PREFIXES:
+        if tuple(significant[:len(prefix)]) == prefix and len(significant) > len(prefix):
+            significant = significant[len(prefix):]
+
+    # Un nome fatto solo di parole generiche ("Calcio Club") resta com'è
+    return tuple(significant or tokens)
+
+
+class TeamIndex:
+    """Indice alias -> voce di classifica costruito una volta per snapshot"""
+
+    def __init__(self, standings):
+        self.entries = []
+        self.entry_tokens = []
+        self.aliases = {}
+        self.tokens = {}
+        ambiguous = set()
+
+        for team_key, team_data in standings.items():
+            entry_id = len(self.entries)
+            self.entries.append((team_key, team_data))
+            self.entry_tokens.append(set(normalize_team_name(team_key)))
+
+            names = {team_key}
+            if isinstance(team_data, dict):
+                names.update(team_data[field] for field in ("team", "team_name") if team_data.get(field))
+
+            for name in names:
+                normalized = normalize_team_name(name)
+                if not normalized:
+                    continue
+                for alias in (" ".join(normalized), "".join(normalized)):
+                    if self.aliases.get(alias, entry_id) != entry_id:
+                        ambiguous.add(alias)
+                    self.aliases[alias] = entry_id
+                for token in normalized:
+                    self.tokens.setdefault(token, set()).add(entry_id)
+
+        # Un alias che porta a due squadre diverse non è un match valido
+        for alias in ambiguous:
+            del self.aliases[alias]
+
+    def lookup(self, name):
+        """Ritorna (team_key, team_data) oppure None se la squadra non c'è o è ambigua"""
+        normalized = normalize_team_name(name)
+        if not normalized:
+            return None
+
+        for alias in (" ".join(normalized), "".join(normalized)):
+            entry_id = self.aliases.get(alias)
+            if entry_id is not None:
+                return self.entries[entry_id]
+
+        return self._scored_lookup(normalized)
+
+    def _scored_lookup(self, normalized):
+        # Fallback: più di metà delle parole in comune, solo con un vincitore netto
+        scores = {}
+        for token in set(normalized):
+            for entry_id in self.tokens.get(token, ()):
+                scores[entry_id] = scores.get(entry_id, 0) + 1
+        if not scores:
+            return None
+
+        wanted = len(set(normalized))
+        ranked = sorted(
+            ((common / max(wanted, len(self.entry_tokens[entry_id])), entry_id) for entry_id, common in scores.items()),
+            reverse=True
+        )
+
+        best_score, best_id = ranked[0]
+        if best_score <= FALLBACK_MIN_SCORE:
+            return None
+        if len(ranked) > 1 and ranked[1][0] == best_score:
+            return None
+        return self.entries[best_id]
+
+    def position(self, name):
+        """Posizione in classifica della squadra, None se non trovata"""
+        entry = self.lookup(name)
+        return entry[1].get("position") if entry else None
+
+    def aurora_position(self):
+        """Posizione di Aurora Seriate nella classifica"""
+        return self.position("Aurora Seriate")
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def team_index_for(standings):
+    """
+    Indice della classifica, costruito alla prima richiesta per quello snapshot.
+    La cache tiene un riferimento allo snapshot così il suo id non viene riusato
+    """
+    key = id(standings)
+    with _index_lock:
+        cached = _index_cache.get(key)
+        if cached and cached[0] is standings:
+            _index_cache.move_to_end(key)
+            return cached[1]
+
+    index = TeamIndex(standings)
+    with _index_lock:
+        _index_cache[key] = (standings, index)
+        while len(_index_cache) > TEAM_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
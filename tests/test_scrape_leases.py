@@ -0,0 +1,53 @@
+"""Lease di scraping: più thread dello stesso processo sulla stessa chiave"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrape_leases import LocalLeaseBackend, SQLiteLeaseBackend, ScrapeCoordinator  # noqa: E402
+
+
+@pytest.fixture(params=["local", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteLeaseBackend(str(tmp_path / "leases.db"))
+    return LocalLeaseBackend()
+
+
+def test_concurrent_same_key_scrapes_once(backend):
+    coordinator = ScrapeCoordinator(backend)
+    scrapes = []
+    results = []
+    start = threading.Barrier(3)
+
+    def scrape():
+        scrapes.append(threading.get_ident())
+        time.sleep(0.3)
+        return {"home": "AURORA SERIATE", "away": "GORLE"}
+
+    def worker():
+        start.wait()
+        results.append(coordinator.run("U17", scrape, result_ttl=60))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(scrapes) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert all(value == {"home": "AURORA SERIATE", "away": "GORLE"} for value, _ in results)
+
+
+def test_release_only_by_the_holding_call(backend):
+    backend.acquire("U17", "node:1:a", 60)
+    backend.release("U17", "node:1:b")
+    assert not backend.acquire("U17", "node:1:b", 60)
+    backend.release("U17", "node:1:a")
+    assert backend.acquire("U17", "node:1:b", 60)
@@ -0,0 +1,34 @@
+"""Indice dei nomi squadra: sigle puntate e fallback a punteggio"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from team_names import TeamIndex, normalize_team_name  # noqa: E402
+
+STANDINGS = {
+    "virescit boccaleone": {"position": 4, "team_name": "VIRESCIT BOCCALEONE"},
+    "or.boccaleone": {"position": 9, "team_name": "OR.BOCCALEONE"},
+    "citta di albino": {"position": 12, "team_name": "A.S.D. Città di Albino"},
+}
+
+
+def test_dotted_names_keep_their_words():
+    assert normalize_team_name("OR.BOCCALEONE") == ("or", "boccaleone")
+    assert normalize_team_name("A.S.D. Città di Albino") == ("albino",)
+    assert normalize_team_name("S.S.D.R.L Gorle") == ("gorle",)
+
+
+def test_boccaleone_does_not_resolve_to_virescit():
+    index = TeamIndex(STANDINGS)
+    assert index.lookup("Boccaleone") is None
+    assert index.position("OR.BOCCALEONE") == 9
+    assert index.position("Or. Boccaleone") == 9
+    assert index.position("Virescit Boccaleone") == 4
+
+
+def test_half_overlap_is_not_a_match():
+    index = TeamIndex({"virtus ciserano": {"position": 2}})
+    assert index.lookup("Ciserano") is None
+    assert index.position("Virtus Ciserano ASD") == 2
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Tracing delle richieste - Aurora Seriate 1967
+Ogni richiesta apre una traccia; cache, coda, lease, browser, Supabase, caricamento
+pagine e parsing aprono span figli. Lo span corrente vive in un contextvar, copiato
+nei worker della coda e nei thread di background, così un /scrape/U19 lento si
+scompone nei suoi passi. Le tracce finite restano in un ring buffer (/debug/traces)
+e, se configurati, vanno in un file JSON lines e a un collector OTLP/HTTP
+"""
+
+import os
+import re
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from json_codec import dumps as json_dumps
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() == "true"
+TRACE_HEADER = "X-Trace-Id"
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", 200))  # Tracce recenti in memoria
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", 500))  # Oltre, gli span di una traccia si contano e basta
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH", "")  # Una traccia per riga, vuoto = disattivato
+TRACE_OTLP_ENDPOINT = os.environ.get("TRACE_OTLP_ENDPOINT", "").rstrip("/")  # es. http://collector:4318
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "aurora-selenium-api")
+
+_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span = ContextVar("aurora_current_span", default=None)
+
+
+def _new_id(size):
+    return os.urandom(size).hex()
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans", "dropped", "lock")
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def add(self, span):
+        with self.lock:
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped += 1
+                return
+            self.spans.append(span)
+
+    @property
+    def root(self):
+        return self.spans[0] if self.spans else None
+
+    def summary(self):
+        root = self.root
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "started_at": root.start,
+            "duration_ms": root.duration_ms,
+            "status": root.attributes.get("status"),
+            "spans": len(self.spans),
+        }
+
+    def to_dict(self):
+        with self.lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {**self.summary(), "dropped_spans": self.dropped, "spans": spans}
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, trace, name, parent_id=None, attributes=None, start=None):
+        self.trace = trace
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end = None
+        self.attributes = attributes or {}
+        self.error = None
+        trace.add(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self):
+        return round(((self.end or time.time()) - self.start) * 1000, 2)
+
+    def to_dict(self):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.start - self.trace.root.start) * 1000, 2),
+            "duration_ms": self.duration_ms,
+            "running": self.end is None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Span figlio dello span corrente. Fuori da una richiesta tracciata non registra
+    nulla (costa la lettura di un contextvar) e restituisce None
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    current = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.time()
+        _current_span.reset(token)
+
+
+def add_span(name, started_at, ended_at, **attributes):
+    """Span già concluso (es. l'attesa in coda, misurata da chi la osserva alla fine)"""
+    parent = _current_span.get()
+    if parent is not None:
+        Span(parent.trace, name, parent.span_id, attributes, start=started_at).end = ended_at
+
+
+def current_trace_id():
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+def _incoming_ids(trace_header, traceparent):
+    """(trace_id, parent_span_id) da X-Trace-Id o da un traceparent W3C, altrimenti nuovi"""
+    match = _TRACEPARENT.match(traceparent or "")
+    if match:
+        return match.group(1), match.group(2)
+    trace_id = (trace_header or "").lower()
+    return (trace_id if _TRACE_ID.match(trace_id) else _new_id(16)), None
+
+
+def start_trace(name, trace_header=None, traceparent=None, **attributes):
+    """Apre la traccia di una richiesta e ne rende corrente lo span radice: (span, token)"""
+    if not TRACING_ENABLED:
+        return None, None
+    trace_id, parent_id = _incoming_ids(trace_header, traceparent)
+    root = Span(Trace(trace_id), name, parent_id, attributes)
+    return root, _current_span.set(root)
+
+
+def finish_trace(root, token, exporter):
+    if root is None:
+        return
+    root.end = time.time()
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        _current_span.set(None)  # Token di un altro contesto (es. risposta in streaming)
+    exporter.export(root.trace)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(traces):
+    """Corpo OTLP/HTTP JSON (v1/traces) per un gruppo di tracce"""
+    spans = []
+    for trace in traces:
+        with trace.lock:
+            trace_spans = list(trace.spans)
+        for index, span in enumerate(trace_spans):
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 2 if index == 0 else 1,  # SERVER per la radice, INTERNAL per gli altri
+                "startTimeUnixNano": str(int(span.start * 1e9)),
+                "endTimeUnixNano": str(int((span.end or time.time()) * 1e9)),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "aurora.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Ring buffer delle tracce recenti più export opzionale (JSONL, OTLP) da un thread dedicato"""
+
+    def __init__(self, size=TRACE_BUFFER_SIZE, jsonl_path=TRACE_JSONL_PATH, otlp_endpoint=TRACE_OTLP_ENDPOINT):
+        self.recent = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.jsonl_path = jsonl_path
+        self.otlp_endpoint = otlp_endpoint
+        self.pending = queue.Queue(maxsize=1000)
+        self.thread = None
+        self.stats = {"exported": 0, "export_errors": 0, "export_dropped": 0}
+
+    def export(self, trace):
+        with self.lock:
+            self.recent.append(trace)
+        if not (self.jsonl_path or self.otlp_endpoint):
+            return
+        self._ensure_thread()
+        try:
+            self.pending.put_nowait(trace)
+        except queue.Full:
+            self.stats["export_dropped"] += 1
+
+    def _ensure_thread(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            # Raggruppa ciò che arriva nel frattempo: una scrittura/POST per gruppo
+            time.sleep(1)
+            while len(batch) < 100:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if self.jsonl_path:
+                    with open(self.jsonl_path, "ab") as f:
+                        for trace in batch:
+                            f.write(json_dumps(trace.to_dict()) + b"\n")
+                if self.otlp_endpoint:
+                    import requests
+                    response = requests.post(f"{self.otlp_endpoint}/v1/traces", json=_otlp_payload(batch), timeout=5)
+                    response.raise_for_status()
+                self.stats["exported"] += len(batch)
+            except Exception as e:
+                self.stats["export_errors"] += 1
+                logger.warning(f"⚠️ Export di {len(batch)} tracce fallito: {e}")
+
+    def recent_traces(self, limit=50, min_ms=0.0):
+        """Riassunti delle tracce più recenti (prima le ultime), oltre min_ms"""
+        with self.lock:
+            traces = list(self.recent)
+        summaries = [trace.summary() for trace in reversed(traces) if trace.root.duration_ms >= min_ms]
+        return summaries[:limit]
+
+    def get(self, trace_id):
+        with self.lock:
+            for trace in self.recent:
+                if trace.trace_id == trace_id:
+                    return trace
+        return None
+
+    def status(self):
+        return {
+            "enabled": TRACING_ENABLED,
+            "buffered": len(self.recent),
+            "buffer_size": self.recent.maxlen,
+            "jsonl_path": self.jsonl_path or None,
+            "otlp_endpoint": self.otlp_endpoint or None,
+            **self.stats,
+        }
+
+
+exporter = TraceExporter()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Avvio in due fasi del server - Aurora Seriate 1967
+Fase 1: l'import dell'app non avvia nulla di pesante e il worker risponde
+subito a /health. Fase 2: un thread in background prepara librerie HTTP,
+client Supabase, calendario giornate e il primo browser del pool.
+/ready espone lo stato del warm-up e il tempo dall'import alla prima richiesta
+"""
+
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_ON_IMPORT = os.environ.get("WARM_UP_ON_IMPORT", "true").lower() == "true"
+
+STATE_PENDING = "pending"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_DEGRADED = "degraded"  # Pronto, ma qualche passo è fallito (es. Chrome): si serve in fallback
+
+
+class WarmUp:
+    """Passi di warm-up eseguiti in ordine su un thread daemon, con tempi ed errori"""
+
+    def __init__(self, import_started_at):
+        self.import_started_at = import_started_at
+        self.import_finished_at = None
+        self.first_request_at = None
+        self.ready_at = None
+        self.state = STATE_PENDING
+        self.steps = []
+        self.results = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def add_step(self, name, fn):
+        self.steps.append((name, fn))
+
+    def start(self):
+        """Avvia il warm-up (una sola volta) e segna la fine dell'import"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.import_finished_at = time.time()
+            self.state = STATE_WARMING
+            self.thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+            self.thread.start()
+
+    def mark_request(self):
+        """Chiamato a ogni richiesta: registra solo la prima"""
+        if self.first_request_at is None:
+            with self.lock:
+                if self.first_request_at is None:
+                    self.first_request_at = time.time()
+                    logger.info(f"⏱️ Prima richiesta {self._ms(self.first_request_at)}ms dopo l'import")
+
+    @property
+    def is_ready(self):
+        return self.state in (STATE_READY, STATE_DEGRADED)
+
+    def _run(self):
+        failed = False
+        for name, fn in self.steps:
+            started = time.time()
+            try:
+                fn()
+                self.results[name] = {"ok": True, "ms": round((time.time() - started) * 1000, 1)}
+            except Exception as e:
+                failed = True
+                self.results[name] = {"ok": False, "ms": round((time.time() - started) * 1000, 1), "error": str(e)}
+                logger.warning(f"⚠️ Warm-up '{name}' fallito: {e}")
+
+        self.ready_at = time.time()
+        self.state = STATE_DEGRADED if failed else STATE_READY
+        logger.info(f"🔥 Warm-up completato ({self.state}) in {self._ms(self.ready_at)}ms dall'import")
+
+    def _ms(self, timestamp):
+        return round((timestamp - self.import_started_at) * 1000, 1) if timestamp else None
+
+    def status(self):
+        return {
+            "ready": self.is_ready,
+            "state": self.state,
+            "steps": {name: self.results.get(name, {"ok": None}) for name, _ in self.steps},
+            "import_ms": self._ms(self.import_finished_at),
+            "import_to_first_request_ms": self._ms(self.first_request_at),
+            "import_to_ready_ms": self._ms(self.ready_at),
+        }
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Coda di lavoro a priorità per lo scraping - Aurora Seriate 1967
+Tutto il lavoro sulle risorse condivise (browser, pagine tuttocampo) passa da
+qui: le richieste interattive di un allenatore passano davanti agli sweep
+batch e ai refresh in background, con aging perché nessuno resti a secco
+"""
+
+import os
+import threading
+import time
+import math
+import itertools
+import logging
+import contextvars
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from deadlines import DeadlineExceeded
+from tracing import span, add_span
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"  # Tap dall'app: /scrape/<category>, /standings/<category>
+PRIORITY_BATCH = "batch"  # Sweep richiesti da un client: /scrape/all, /batch
+PRIORITY_BACKGROUND = "background"  # Job e refresh di manutenzione
+
+PRIORITY_CLASSES = {
+    PRIORITY_INTERACTIVE: 0,
+    PRIORITY_BATCH: 1,
+    PRIORITY_BACKGROUND: 2,
+}
+
+# Ogni QUEUE_AGING_SECONDS di attesa un lavoro guadagna una classe di priorità
+QUEUE_AGING_SECONDS = float(os.environ.get("QUEUE_AGING_SECONDS", 30))
+QUEUE_WAIT_SAMPLES = 200  # Attese recenti conservate per classe (per il p95)
+
+# Controllo di ammissione: oltre questa coda (o attesa stimata) si rifiuta subito con 429
+ADMISSION_MAX_DEPTH = int(os.environ.get("ADMISSION_MAX_DEPTH", 12))
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", 90))  # Secondi di attesa stimata
+
+
+class Overloaded(Exception):
+    """Il server è saturo: riprovare dopo retry_after secondi"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class _WorkItem:
+    __slots__ = ("priority", "rank", "seq", "fn", "args", "kwargs", "future", "enqueued_at", "deadline", "context")
+
+    def __init__(self, priority, seq, fn, args, kwargs, deadline=None):
+        self.priority = priority
+        self.rank = PRIORITY_CLASSES[priority]
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.time()
+        self.deadline = deadline
+        self.context = contextvars.copy_context()  # Span della richiesta che ha accodato il lavoro
+
+    def effective_rank(self, now, aging_seconds):
+        return self.rank - (now - self.enqueued_at) / aging_seconds
+
+
+class ScrapeWorkQueue:
+    """Coda a priorità con un numero fisso di worker e statistiche per classe"""
+
+    def __init__(self, workers=2, aging_seconds=QUEUE_AGING_SECONDS):
+        self.workers = workers
+        self.aging_seconds = aging_seconds
+        self.pending = []
+        self.running = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.threads = []
+        self.stats = {
+            priority: {
+                "submitted": 0,
+                "started": 0,
+                "completed": 0,
+                "failed": 0,
+                "cancelled": 0,
+                "rejected": 0,
+                "wait_total": 0.0,
+                "wait_max": 0.0,
+                "run_total": 0.0,
+                "recent_waits": deque(maxlen=QUEUE_WAIT_SAMPLES),
+            }
+            for priority in PRIORITY_CLASSES
+        }
+
+    def submit(self, priority, fn, *args, **kwargs):
+        """Accoda fn(*args, **kwargs) e ritorna un Future"""
+        return self._submit(priority, fn, args, kwargs)
+
+    def _submit(self, priority, fn, args, kwargs, deadline=None):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class '{priority}'")
+
+        item = _WorkItem(priority, next(self.sequence), fn, args, kwargs, deadline)
+        with self.condition:
+            self._ensure_workers()
+            self.pending.append(item)
+            self.stats[priority]["submitted"] += 1
+            self.condition.notify()
+        return item.future
+
+    def run(self, priority, fn, *args, **kwargs):
+        """Accoda e attende il risultato (le eccezioni vengono rilanciate)"""
+        return self.submit(priority, fn, *args, **kwargs).result()
+
+    def run_until(self, deadline, priority, fn, *args, **kwargs):
+        """
+        Come run, ma attende al massimo fino alla scadenza: un lavoro ancora in
+        coda viene cancellato, uno già partito si ferma al prossimo controllo
+        della scadenza che riceve. deadline=None equivale a run
+        """
+        if deadline is None:
+            return self.run(priority, fn, *args, **kwargs)
+
+        future = self._submit(priority, fn, args, kwargs, deadline)
+        try:
+            return future.result(timeout=deadline.remaining())
+        except FutureTimeout:
+            if future.cancel():
+                with self.condition:
+                    self.stats[priority]["cancelled"] += 1
+            raise DeadlineExceeded(f"Deadline of {deadline.budget:g}s exceeded waiting for {priority} work")
+
+    def average_run_seconds(self, priority, default=10.0):
+        """Durata media di un lavoro della classe (default senza campioni)"""
+        with self.condition:
+            stats = self.stats[priority]
+            finished = stats["completed"] + stats["failed"]
+            return stats["run_total"] / finished if finished else default
+
+    def estimated_wait(self, priority):
+        """
+        Attesa stimata (secondi) per un nuovo lavoro della classe: lavori in
+        corso e in coda con priorità pari o maggiore, divisi tra i worker
+        """
+        rank = PRIORITY_CLASSES[priority]
+        with self.condition:
+            ahead = sum(self.running.values()) + sum(1 for item in self.pending if item.rank <= rank)
+        if ahead < self.workers:
+            return 0.0
+        return math.ceil((ahead + 1) / self.workers) * self.average_run_seconds(priority)
+
+    def admit(self, priority, deadline=None):
+        """
+        Ammette un nuovo lavoro o solleva Overloaded con un Retry-After calcolato:
+        coda troppo lunga, attesa stimata oltre ADMISSION_MAX_WAIT o oltre la
+        scadenza della richiesta (inutile accodare ciò che nessuno leggerà)
+        """
+        depth = self.depth()
+        wait = self.estimated_wait(priority)
+        limit = ADMISSION_MAX_WAIT if deadline is None else min(ADMISSION_MAX_WAIT, deadline.remaining())
+
+        if depth >= ADMISSION_MAX_DEPTH:
+            reason = f"queue depth {depth} >= {ADMISSION_MAX_DEPTH}"
+        elif wait > limit:
+            reason = f"estimated wait {wait:.0f}s > {limit:.0f}s"
+        else:
+            return wait
+
+        with self.condition:
+            self.stats[priority]["rejected"] += 1
+        logger.warning(f"🚦 Lavoro {priority} rifiutato: {reason}")
+        raise Overloaded(f"Server busy ({reason}), try again later", wait or self.average_run_seconds(priority))
+
+    def depth(self, priority=None):
+        with self.condition:
+            if priority is None:
+                return len(self.pending)
+            return sum(1 for item in self.pending if item.priority == priority)
+
+    def status(self):
+        """Profondità, lavori in corso e tempi di attesa per classe"""
+        with self.condition:
+            classes = {}
+            for priority, stats in self.stats.items():
+                waits = sorted(stats["recent_waits"])
+                started = stats["started"]
+                classes[priority] = {
+                    "depth": sum(1 for item in self.pending if item.priority == priority),
+                    "running": self.running[priority],
+                    "submitted": stats["submitted"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "cancelled": stats["cancelled"],
+                    "rejected": stats["rejected"],
+                    "estimated_wait_seconds": None,
+                    "wait_avg_seconds": round(stats["wait_total"] / started, 3) if started else 0.0,
+                    "wait_p95_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                    "wait_max_seconds": round(stats["wait_max"], 3),
+                    "run_avg_seconds": round(stats["run_total"] / (stats["completed"] + stats["failed"]), 3) if stats["completed"] + stats["failed"] else 0.0,
+                }
+
+        # Stima fuori dal lock della condition (estimated_wait lo riacquisisce)
+        for priority in classes:
+            classes[priority]["estimated_wait_seconds"] = round(self.estimated_wait(priority), 1)
+
+        return {
+            "workers": self.workers,
+            "aging_seconds": self.aging_seconds,
+            "depth": len(self.pending),
+            "admission": {"max_depth": ADMISSION_MAX_DEPTH, "max_wait_seconds": ADMISSION_MAX_WAIT},
+            "classes": classes,
+        }
+
+    def _ensure_workers(self):
+        # I thread partono al primo lavoro, non all'import
+        while len(self.threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"scrape-worker-{len(self.threads)}", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def _next_item(self):
+        now = time.time()
+        best = min(self.pending, key=lambda item: (item.effective_rank(now, self.aging_seconds), item.seq))
+        self.pending.remove(best)
+        return best
+
+    @staticmethod
+    def _run_item(item):
+        """Esegue il lavoro nel contesto di chi l'ha accodato, con attesa ed esecuzione come span"""
+        add_span("queue.wait", item.enqueued_at, time.time(), priority=item.priority)
+        with span("queue.run", priority=item.priority):
+            return item.fn(*item.args, **item.kwargs)
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                item = self._next_item()
+                waited = time.time() - item.enqueued_at
+                stats = self.stats[item.priority]
+                stats["started"] += 1
+                stats["wait_total"] += waited
+                stats["wait_max"] = max(stats["wait_max"], waited)
+                stats["recent_waits"].append(waited)
+                self.running[item.priority] += 1
+
+            if waited > 5:
+                logger.info(f"⏳ Lavoro {item.priority} in coda per {waited:.1f}s")
+
+            if not item.future.set_running_or_notify_cancel():
+                with self.condition:
+                    self.running[item.priority] -= 1
+                continue
+
+            if item.deadline is not None and item.deadline.expired():
+                # Nessuno aspetta più questo risultato: il browser resta libero
+                item.future.set_exception(DeadlineExceeded("Deadline exceeded while queued"))
+                with self.condition:
+                    self.running[item.priority] -= 1
+                    self.stats[item.priority]["cancelled"] += 1
+                continue
+
+            run_started = time.time()
+            try:
+                result = item.context.run(self._run_item, item)
+            except BaseException as e:
+                item.future.set_exception(e)
+                outcome = "failed"
+            else:
+                item.future.set_result(result)
+                outcome = "completed"
+
+            with self.condition:
+                self.running[item.priority] -= 1
+                self.stats[item.priority][outcome] += 1
+                self.stats[item.priority]["run_total"] += time.time() - run_started